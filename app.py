@@ -3,12 +3,27 @@ import os
 import json
 import csv
 import io
-from werkzeug.utils import secure_filename
+import shutil
+import contextlib
+import contextvars
+import zipfile
+import tarfile
+import xml.etree.ElementTree as ElementTree
 import uuid
 from datetime import datetime
 import re
+import hashlib
+import threading
+import time
+import random
+import math
+from collections import Counter, deque
+from functools import cached_property
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pymongo
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 import PyPDF2
 import pdfplumber
 import google.generativeai as genai
@@ -16,6 +31,20 @@ import requests
 
 from dotenv import load_dotenv
 
+# Gemini errors worth retrying; without google-api-core every exception is retried
+try:
+    from google.api_core import exceptions as google_exceptions
+    RETRYABLE_AI_ERRORS = (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        ConnectionError,
+        TimeoutError
+    )
+except ImportError:
+    RETRYABLE_AI_ERRORS = (Exception,)
+
 # Try to import docx, but don't fail if it's not available
 try:
     import docx
@@ -24,12 +53,22 @@ except ImportError:
     DOCX_AVAILABLE = False
     print("python-docx not installed. DOCX parsing will be limited.")
 
+# Advisory file locks: fcntl on POSIX, msvcrt on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
 app = Flask(__name__)
 
+load_dotenv()  # Load variables from .env before reading any configuration
+
 # Configure upload folder and allowed extensions
 UPLOAD_FOLDER = 'uploads'
 CV_FOLDER = 'cv_files'  # New folder for storing CV files with URLs
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc', 'txt', 'rtf', 'csv'}
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
 
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
@@ -40,19 +79,153 @@ if not os.path.exists(CV_FOLDER):
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['CV_FOLDER'] = CV_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+app.config['ARCHIVE_MAX_MEMBERS'] = int(os.getenv('ARCHIVE_MAX_MEMBERS', 1000))
+app.config['ARCHIVE_MAX_MEMBER_SIZE'] = int(os.getenv('ARCHIVE_MAX_MEMBER_SIZE', 16 * 1024 * 1024))
+app.config['ARCHIVE_BATCH_SIZE'] = int(os.getenv('ARCHIVE_BATCH_SIZE', 32))  # Members held in memory at once
+app.config['CHUNKED_UPLOAD_CHUNK_SIZE'] = int(os.getenv('CHUNKED_UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024))  # Suggested to clients
+app.config['CHUNKED_UPLOAD_MAX_BYTES'] = int(os.getenv('CHUNKED_UPLOAD_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+app.config['CHUNKED_UPLOAD_TTL_SECONDS'] = int(os.getenv('CHUNKED_UPLOAD_TTL_SECONDS', 24 * 3600))
+app.config['CV_GC_GRACE_SECONDS'] = int(os.getenv('CV_GC_GRACE_SECONDS', 3600))  # Never collect CV files newer than this
+app.config['EXTRACTION_WORKERS'] = int(os.getenv('EXTRACTION_WORKERS', os.cpu_count() or 1))  # Processes used for batch text extraction
+app.config['EXTRACTION_CACHE_FOLDER'] = os.getenv('EXTRACTION_CACHE_FOLDER', 'extraction_cache')
+app.config['EXTRACTION_CACHE_MAX_BYTES'] = int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 0 disables the cache
+app.config['PDF_EXTRACTION_MODE'] = os.getenv('PDF_EXTRACTION_MODE', 'full')  # 'full' or 'budgeted'
+app.config['PDF_MAX_PAGES'] = int(os.getenv('PDF_MAX_PAGES', 20))
+app.config['PDF_PAGE_TIME_BUDGET'] = float(os.getenv('PDF_PAGE_TIME_BUDGET', 5))  # Seconds
+app.config['PDF_DOCUMENT_TIME_BUDGET'] = float(os.getenv('PDF_DOCUMENT_TIME_BUDGET', 20))  # Seconds
+app.config['AI_CACHE_FOLDER'] = os.getenv('AI_CACHE_FOLDER', 'ai_cache')
+app.config['AI_CACHE_MAX_BYTES'] = int(os.getenv('AI_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # 0 disables the cache
+app.config['AI_CACHE_TTL_SECONDS'] = int(os.getenv('AI_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+app.config['AI_MAX_IN_FLIGHT'] = int(os.getenv('AI_MAX_IN_FLIGHT', 4))  # Concurrent Gemini requests per process
+app.config['AI_REQUESTS_PER_MINUTE'] = float(os.getenv('AI_REQUESTS_PER_MINUTE', 60))  # 0 disables rate limiting
+app.config['AI_TOKEN_BUDGET'] = int(os.getenv('AI_TOKEN_BUDGET', 4000))  # Approximate prompt tokens of resume text
+app.config['AI_CHARS_PER_TOKEN'] = int(os.getenv('AI_CHARS_PER_TOKEN', 4))
+app.config['AI_DROP_SECTIONS'] = set(filter(None, os.getenv('AI_DROP_SECTIONS', 'interests,references').split(',')))
+app.config['AI_TRIM_ORDER'] = list(filter(None, os.getenv('AI_TRIM_ORDER', 'projects,certifications,languages').split(',')))
+app.config['AI_FURNITURE_MIN_REPEATS'] = int(os.getenv('AI_FURNITURE_MIN_REPEATS', 3))  # Short lines repeated this often are page headers/footers
+app.config['AI_BATCH_SIZE'] = int(os.getenv('AI_BATCH_SIZE', 1))  # Resumes packed into one Gemini request; 1 disables batching
+app.config['PARSER_CPU_BUDGET'] = float(os.getenv('PARSER_CPU_BUDGET', 1.0))  # CPU seconds of regex work per resume; 0 disables
+app.config['PARSER_MAX_REGEX_INPUT'] = int(os.getenv('PARSER_MAX_REGEX_INPUT', 100000))  # Characters any one pattern looks at
+app.config['SKILL_TAXONOMY_FILE'] = os.getenv('SKILL_TAXONOMY_FILE', os.path.join(app.root_path, 'skill_taxonomy.json'))
+app.config['AI_PARSING_MODE'] = os.getenv('AI_PARSING_MODE', 'full')  # 'full' or 'hybrid' (rule-based first, Gemini only for weak fields)
+app.config['AI_CONFIDENCE_THRESHOLD'] = float(os.getenv('AI_CONFIDENCE_THRESHOLD', 0.75))
+app.config['AI_MAX_RETRIES'] = int(os.getenv('AI_MAX_RETRIES', 3))
+app.config['AI_RETRY_BASE_DELAY'] = float(os.getenv('AI_RETRY_BASE_DELAY', 1.0))  # Seconds
+app.config['AI_CALL_TIMEOUT'] = float(os.getenv('AI_CALL_TIMEOUT', 30))  # Per-request deadline in seconds
+app.config['AI_BREAKER_WINDOW_SECONDS'] = float(os.getenv('AI_BREAKER_WINDOW_SECONDS', 60))
+app.config['AI_BREAKER_MIN_CALLS'] = int(os.getenv('AI_BREAKER_MIN_CALLS', 5))  # Calls in the window before the breaker may open
+app.config['AI_BREAKER_ERROR_RATE'] = float(os.getenv('AI_BREAKER_ERROR_RATE', 0.5))
+app.config['AI_BREAKER_P95_SECONDS'] = float(os.getenv('AI_BREAKER_P95_SECONDS', 20))
+app.config['AI_BREAKER_OPEN_SECONDS'] = float(os.getenv('AI_BREAKER_OPEN_SECONDS', 30))  # Time before half-open probing
+app.config['AI_BREAKER_HALF_OPEN_PROBES'] = int(os.getenv('AI_BREAKER_HALF_OPEN_PROBES', 1))
+app.config['LLM_BACKEND'] = os.getenv('LLM_BACKEND', 'gemini')  # 'gemini', or 'stub' for offline load testing
+app.config['LLM_STUB_LATENCY'] = float(os.getenv('LLM_STUB_LATENCY', 1.0))  # Mean seconds per stub call
+app.config['LLM_STUB_LATENCY_JITTER'] = float(os.getenv('LLM_STUB_LATENCY_JITTER', 0.0))  # +/- seconds, uniform
+app.config['LLM_STUB_ERROR_RATE'] = float(os.getenv('LLM_STUB_ERROR_RATE', 0.0))  # Fraction of stub calls that fail
+app.config['LLM_STUB_RESPONSE_FILE'] = os.getenv('LLM_STUB_RESPONSE_FILE', '')  # Canned reply; derived from the prompt when empty
+app.config['LLM_STUB_SEED'] = os.getenv('LLM_STUB_SEED')  # Fixes the stub's latency and error sequence
 
-# Google Gemini AI Setup
-load_dotenv()  # Load variables from .env
+# Gemini model and prompt version; bump AI_PROMPT_VERSION whenever the prompt changes
+AI_MODEL_NAME = "models/gemini-1.5-pro"
+AI_PROMPT_VERSION = 1
 
-try:
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("API key not found. Set GOOGLE_API_KEY in .env")
+# LLM backends: generate(prompt, timeout) returns the reply text, and name scopes the AI cache
+class GeminiBackend:
+    def __init__(self, api_key):
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(AI_MODEL_NAME)
+        self.name = AI_MODEL_NAME
+    
+    def generate(self, prompt, timeout):
+        return self.model.generate_content(prompt, request_options={"timeout": timeout}).text
+
+class StubLLMBackend:
+    """Local stand-in for Gemini with configurable latency and failure rate. It replies with
+    canned_response when given, otherwise with JSON derived from the resumes in the prompt."""
+    
+    def __init__(self, latency=1.0, jitter=0.0, error_rate=0.0, canned_response=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.canned_response = canned_response
+        self.name = "stub"
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+    
+    def generate(self, prompt, timeout):
+        with self.lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            fail = self.random.random() < self.error_rate
+        if timeout and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stub LLM call exceeded {timeout}s")
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError("Stub LLM simulated failure")
+        if self.canned_response is not None:
+            return self.canned_response
+        return stub_llm_response(prompt)
+
+# Build a plausible reply for any of our prompts from the rule-based extractors
+def stub_llm_response(prompt):
+    batch = re.findall(r'=== RESUME (\d+) START ===\n(.*?)\n=== RESUME \1 END ===', prompt, re.DOTALL)
+    if batch:
+        return json.dumps([dict(stub_resume_fields(text), **{"Resume Number": int(number)}) for number, text in batch])
+    
+    text_match = re.search(r'### Resume Text:\n(.*?)\n\s*### Return JSON Format:', prompt, re.DOTALL)
+    resume_text = text_match.group(1) if text_match else prompt
+    fields = None
+    fields_match = re.search(r'Extract ONLY the following fields from the resume text below: (.*?)\.\n', prompt)
+    if fields_match:
+        fields = fields_match.group(1).split(', ')
+    return json.dumps(stub_resume_fields(resume_text, fields))
+
+def stub_resume_fields(resume_text, fields=None):
+    document = ParsedDocument(resume_text)
+    skills = extract_skills(document)
+    data = {
+        "Full Name": document.content_lines[0][1] if document.content_lines else "",
+        "Contact Number": first_match_text(PATTERN_REGISTRY['phone'][2], resume_text) or "",
+        "Email Address": first_match_text(PATTERN_REGISTRY['email'][0], resume_text) or "",
+        "Location": "",
+        "LinkedIn": "",
+        "GitHub": "",
+        "Skills": skills,
+        "Education": extract_education(document),
+        "Work Experience": extract_experience(document),
+        "Certifications": [],
+        "Languages": [],
+        "Suggested Category": "",
+        "Recommended Roles": generate_recommended_roles(skills)
+    }
+    if fields:
+        data = {field: data.get(field, "") for field in fields}
+    return data
 
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("models/gemini-1.5-pro")
+# LLM backend setup; gemini_available means whichever backend is configured is usable
+llm_backend = None
+try:
+    if app.config['LLM_BACKEND'] == 'stub':
+        canned_response = None
+        if app.config['LLM_STUB_RESPONSE_FILE']:
+            with open(app.config['LLM_STUB_RESPONSE_FILE'], 'r', encoding='utf-8') as file:
+                canned_response = file.read()
+        llm_backend = StubLLMBackend(
+            latency=app.config['LLM_STUB_LATENCY'],
+            jitter=app.config['LLM_STUB_LATENCY_JITTER'],
+            error_rate=app.config['LLM_STUB_ERROR_RATE'],
+            canned_response=canned_response,
+            seed=app.config['LLM_STUB_SEED']
+        )
+        print("Using stub LLM backend")
+    else:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("API key not found. Set GOOGLE_API_KEY in .env")
+        
+        llm_backend = GeminiBackend(api_key)
+        print("Google Gemini AI setup successful")
     gemini_available = True
-    print("Google Gemini AI setup successful")
 except Exception as e:
     print(f"Google Gemini AI setup error: {e}")
     gemini_available = False
@@ -71,8 +244,83 @@ except Exception as e:
     # Fallback to in-memory storage
     mongodb_available = False
 
+# In-memory resume records with hash indexes on their dedup_keys
+class ResumeStore:
+    """Iterates like the list it replaces, in insertion order, over a snapshot of the records.
+    Records are keyed by _id, so removal is O(1), and each dedup_keys field maps a
+    normalized value to the set of record IDs that have it. cv_files does the same for
+    stored CV filenames."""
+    def __init__(self):
+        self.records = {}
+        self.positions = {}
+        self.sequence = 0
+        self.indexes = {}
+        self.cv_files = {}
+        self.lock = threading.Lock()
+    
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.records.values()))
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def get(self, resume_id):
+        return self.records.get(resume_id)
+    
+    def append(self, resume_data):
+        keys = resume_data.setdefault("dedup_keys", duplicate_keys(resume_data))
+        with self.lock:
+            resume_id = resume_data['_id']
+            self.records[resume_id] = resume_data
+            self.positions[resume_id] = self.sequence
+            self.sequence += 1
+            for field, value in keys.items():
+                if value:
+                    self.indexes.setdefault(field, {}).setdefault(value, set()).add(resume_id)
+            if resume_data.get('cv_filename'):
+                self.cv_files.setdefault(resume_data['cv_filename'], set()).add(resume_id)
+    
+    def remove(self, resume_id):
+        with self.lock:
+            resume_data = self.records.pop(resume_id, None)
+            if resume_data is None:
+                return None
+            del self.positions[resume_id]
+            for field, value in resume_data["dedup_keys"].items():
+                index = self.indexes.get(field, {})
+                resume_ids = index.get(value)
+                if resume_ids is not None:
+                    resume_ids.discard(resume_id)
+                    if not resume_ids:
+                        del index[value]
+            resume_ids = self.cv_files.get(resume_data.get('cv_filename'))
+            if resume_ids is not None:
+                resume_ids.discard(resume_id)
+                if not resume_ids:
+                    del self.cv_files[resume_data['cv_filename']]
+            return resume_data
+    
+    def count_cv_references(self, cv_filename):
+        with self.lock:
+            return len(self.cv_files.get(cv_filename, ()))
+    
+    def cv_filenames(self):
+        with self.lock:
+            return set(self.cv_files)
+    
+    def find_duplicates(self, *keys_list):
+        """Records sharing any non-empty key with any of the given dedup_keys, in insertion order"""
+        with self.lock:
+            resume_ids = set()
+            for keys in keys_list:
+                for field, value in keys.items():
+                    if value:
+                        resume_ids.update(self.indexes.get(field, {}).get(value, ()))
+            return [self.records[resume_id] for resume_id in sorted(resume_ids, key=self.positions.__getitem__)]
+
 # Initialize in-memory storage
-resumes_data = []
+resumes_data = ResumeStore()
 applications_data = []
 
 # Helper function to check allowed file extensions
@@ -80,43 +328,166 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # Helper function to generate CV URL
-def generate_cv_url(original_filename):
-    """Generate a unique URL for the CV file"""
+def generate_cv_url(original_filename, content_hash=None):
+    """Generate a unique URL for the CV file; with a content hash, identical CVs share one stored file"""
     unique_id = str(uuid.uuid4())
     file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else 'pdf'
-    cv_filename = f"{unique_id}.{file_extension}"
+    cv_filename = f"{content_hash or unique_id}.{file_extension}"
     cv_url = f"/view_cv/{unique_id}"
     return cv_url, cv_filename
 
+# Helper functions to open either a file path or an in-memory stream
+def open_binary(file_path):
+    if hasattr(file_path, 'read'):
+        file_path.seek(0)
+        return contextlib.nullcontext(file_path)
+    return open(file_path, 'rb')
+
+def open_text(file_path, encoding):
+    if hasattr(file_path, 'read'):
+        file_path.seek(0)
+        return io.StringIO(file_path.read().decode(encoding))
+    return open(file_path, 'r', encoding=encoding)
+
 # Helper function to extract text from PDF using pdfplumber
 def extract_text_from_pdf(file_path):
+    if app.config['PDF_EXTRACTION_MODE'] == 'budgeted':
+        text, truncation = extract_text_from_pdf_budgeted(file_path)
+    else:
+        text, truncation = extract_text_from_pdf_budgeted(file_path, max_pages=0, page_budget=0, document_budget=0)
+    return text
+
+# Extract PDF text page by page, stopping early once a page or time budget is used up
+def extract_text_from_pdf_budgeted(file_path, max_pages=None, page_budget=None, document_budget=None):
+    """Return (text, truncation) where truncation is None when every page was read,
+    otherwise 'page_limit', 'page_time' or 'document_time'. A limit of 0 disables it."""
+    if max_pages is None:
+        max_pages = app.config['PDF_MAX_PAGES']
+    if page_budget is None:
+        page_budget = app.config['PDF_PAGE_TIME_BUDGET']
+    if document_budget is None:
+        document_budget = app.config['PDF_DOCUMENT_TIME_BUDGET']
+    
+    def read_pages(pages, extract_page, separator):
+        parts = []
+        truncation = None
+        start_time = time.monotonic()
+        for page_num, page in enumerate(pages):
+            if max_pages and page_num >= max_pages:
+                truncation = 'page_limit'
+                break
+            if document_budget and time.monotonic() - start_time > document_budget:
+                truncation = 'document_time'
+                break
+            
+            page_start_time = time.monotonic()
+            parts.append(extract_page(page) + separator)
+            if page_budget and time.monotonic() - page_start_time > page_budget and page_num + 1 < len(pages):
+                truncation = 'page_time'
+                break
+        return "".join(parts), truncation
+    
+    def pdfplumber_page_text(page):
+        text = page.extract_text() or ""
+        if hasattr(page, 'close'):
+            page.close()  # Release cached layout objects before the next page
+        return text
+    
     try:
-        text = ""
+        if hasattr(file_path, 'seek'):
+            file_path.seek(0)
         with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-        return text
+            return read_pages(pdf.pages, pdfplumber_page_text, "")
     except Exception as e:
         print(f"Error extracting text with pdfplumber: {e}")
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(pdf_reader.pages)):
-                    text += pdf_reader.pages[page_num].extract_text() + "\n"
-            return text
+            with open_binary(file_path) as file:
+                return read_pages(PyPDF2.PdfReader(file).pages, lambda page: page.extract_text(), "\n")
         except Exception as e2:
             print(f"Error extracting text with PyPDF2: {e2}")
-            return ""
+            return "", None
+
+# WordprocessingML namespace used by DOCX document, header and footer parts
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# Yield the text of each paragraph in a DOCX XML part, including paragraphs inside table cells
+def iter_docx_paragraphs(xml_file):
+    paragraph_depth = 0
+    run_depth = 0
+    parts = []
+    for event, element in ElementTree.iterparse(xml_file, events=('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            if tag == WORD_NAMESPACE + 'p':
+                paragraph_depth += 1
+            elif tag == WORD_NAMESPACE + 'r':
+                run_depth += 1
+            continue
+        
+        if tag == WORD_NAMESPACE + 'r':
+            run_depth -= 1
+        elif run_depth and tag == WORD_NAMESPACE + 't':
+            parts.append(element.text or "")
+        elif run_depth and tag == WORD_NAMESPACE + 'tab':
+            parts.append("\t")
+        elif run_depth and tag in (WORD_NAMESPACE + 'br', WORD_NAMESPACE + 'cr'):
+            parts.append("\n")
+        elif tag == WORD_NAMESPACE + 'p':
+            paragraph_depth -= 1
+            # Paragraphs nested in text boxes are folded into their enclosing paragraph
+            if paragraph_depth == 0:
+                yield "".join(parts)
+                parts = []
+                element.clear()
+
+# Stream DOCX text straight from the zip package without building the python-docx object model
+def extract_text_from_docx_streaming(file_path):
+    """Return body paragraphs and table cells, then header and footer text, one paragraph per line.
+    Headers and footers go last so the body's first line (usually the name) stays first, and
+    each of their paragraphs appears once however many first-page/default/even variants repeat it."""
+    if hasattr(file_path, 'seek'):
+        file_path.seek(0)
+    
+    def part_number(name):
+        digits = re.sub(r'\D', '', name.rsplit('/', 1)[-1])
+        return int(digits) if digits else 0
+    
+    lines = []
+    with zipfile.ZipFile(file_path) as package:
+        names = package.namelist()
+        if 'word/document.xml' not in names:
+            raise ValueError("Not a DOCX package: word/document.xml is missing")
+        
+        with package.open('word/document.xml') as xml_file:
+            for paragraph in iter_docx_paragraphs(xml_file):
+                lines.append(paragraph + "\n")
+        
+        headers = sorted((name for name in names if re.match(r'word/header\d*\.xml$', name)), key=part_number)
+        footers = sorted((name for name in names if re.match(r'word/footer\d*\.xml$', name)), key=part_number)
+        seen = set()
+        for part_name in headers + footers:
+            with package.open(part_name) as xml_file:
+                for paragraph in iter_docx_paragraphs(xml_file):
+                    if paragraph not in seen:
+                        seen.add(paragraph)
+                        lines.append(paragraph + "\n")
+    return "".join(lines)
 
 # Helper function to extract text from DOCX
 def extract_text_from_docx(file_path):
+    try:
+        return extract_text_from_docx_streaming(file_path)
+    except Exception as e:
+        print(f"Streaming DOCX extraction failed, falling back to python-docx: {e}")
+    
     text = ""
     if not DOCX_AVAILABLE:
         print("python-docx not installed. Cannot extract text from DOCX.")
         return "ERROR: python-docx not installed. Cannot extract text from DOCX."
     
     try:
+        if hasattr(file_path, 'seek'):
+            file_path.seek(0)
         doc = docx.Document(file_path)
         for para in doc.paragraphs:
             text += para.text + "\n"
@@ -128,8 +499,7 @@ def extract_text_from_docx(file_path):
 def extract_text_from_csv(file_path):
     text = ""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            import csv
+        with open_text(file_path, 'utf-8') as file:
             csv_reader = csv.reader(file)
             for row in csv_reader:
                 text += " ".join(row) + "\n"
@@ -141,11 +511,11 @@ def extract_text_from_csv(file_path):
 def extract_text_from_txt(file_path):
     text = ""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
+        with open_text(file_path, 'utf-8') as file:
             text = file.read()
     except UnicodeDecodeError:
         try:
-            with open(file_path, 'r', encoding='latin-1') as file:
+            with open_text(file_path, 'latin-1') as file:
                 text = file.read()
         except Exception as e:
             print(f"Error extracting text from TXT with latin-1 encoding: {e}")
@@ -153,53 +523,524 @@ def extract_text_from_txt(file_path):
         print(f"Error extracting text from TXT: {e}")
     return text
 
+# Size-bounded JSON cache stored as one file per key
+class DiskCache:
+    """On-disk cache that evicts the least recently used entries once max_bytes is exceeded.
+    With ttl_seconds set, entries older than that are treated as missing and removed."""
+    
+    def __init__(self, folder, max_bytes, ttl_seconds=None):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.approx_bytes = None
+        if not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+    
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+    
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+            value = entry['value']
+            if self.ttl_seconds and time.time() - entry['stored_at'] > self.ttl_seconds:
+                os.remove(path)
+                self.expired += 1
+                self.misses += 1
+                return None
+            os.utime(path)  # Mark entry as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            # Truncated or old-format entry: drop it so the caller's set() writes a fresh one
+            print(f"Discarding malformed cache entry {key}: {e}")
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            self.misses += 1
+            return None
+        except Exception as e:
+            print(f"Error reading cache entry {key}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+    
+    def set(self, key, value):
+        path = self._path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump({'stored_at': time.time(), 'value': value}, file)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Error writing cache entry {key}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        
+        if self.approx_bytes is None:
+            self.evict()
+        else:
+            self.approx_bytes += os.path.getsize(path)
+            if self.approx_bytes > self.max_bytes:
+                self.evict()
+    
+    def evict(self):
+        entries = []
+        total_bytes = 0
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+        
+        if total_bytes > self.max_bytes:
+            entries.sort()
+            for mtime, size, path in entries:
+                if total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total_bytes -= size
+                    self.evictions += 1
+                except FileNotFoundError:
+                    total_bytes -= size
+                except Exception as e:
+                    print(f"Error evicting cache entry {path}: {e}")
+        
+        self.approx_bytes = total_bytes
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'expired': self.expired,
+            'evictions': self.evictions
+        }
+
+# Extractor name/version per file type; bump a version to invalidate its cached text
+EXTRACTOR_VERSIONS = {
+    'pdf': 'pdfplumber+PyPDF2/1',
+    'docx': 'docx-stream/1',
+    'doc': 'docx-stream/1',
+    'csv': 'csv/1',
+    'txt': 'txt/1',
+    'rtf': 'txt/1'
+}
+
+extraction_cache = DiskCache(app.config['EXTRACTION_CACHE_FOLDER'], app.config['EXTRACTION_CACHE_MAX_BYTES'])
+
+def extraction_cache_key(content_hash, file_extension):
+    extractor = EXTRACTOR_VERSIONS.get(file_extension)
+    if not extractor:
+        return None
+    if file_extension == 'pdf' and app.config['PDF_EXTRACTION_MODE'] == 'budgeted':
+        extractor += f";max_pages={app.config['PDF_MAX_PAGES']}"
+    return hashlib.sha256(f"{extractor}:{content_hash}".encode('utf-8')).hexdigest()
+
 # Extract text based on file type
 def extract_text(file_path):
-    file_extension = file_path.rsplit('.', 1)[1].lower()
+    return extract_text_with_info(file_path)[0]
+
+# Extract text and report truncation
+def extract_text_with_info(file_path):
+    """Return (text, truncation); truncation is None unless a PDF budget cut extraction short"""
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    return extract_text_from_bytes(data, file_path)
+
+# Extract text from file content held in memory, reusing cached text for files seen before
+def extract_text_from_bytes(data, filename):
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    
+    cache_key = None
+    if app.config['EXTRACTION_CACHE_MAX_BYTES'] > 0:
+        try:
+            cache_key = extraction_cache_key(hashlib.sha256(data).hexdigest(), file_extension)
+            if cache_key:
+                cached = extraction_cache.get(cache_key)
+                if cached is not None:
+                    return cached['text'], cached.get('truncation')
+        except Exception as e:
+            print(f"Error checking extraction cache: {e}")
+            cache_key = None
+    
+    text, truncation = extract_text_by_type(io.BytesIO(data), file_extension)
+    
+    # Time-based truncation depends on load, so only complete or page-capped text is cached
+    if cache_key and text and not text.startswith("ERROR:") and truncation in (None, 'page_limit'):
+        extraction_cache.set(cache_key, {
+            'text': text,
+            'truncation': truncation,
+            'extractor': EXTRACTOR_VERSIONS[file_extension]
+        })
+    return text, truncation
+
+def extract_text_by_type(file_path, file_extension):
     if file_extension == 'pdf':
-        return extract_text_from_pdf(file_path)
+        if app.config['PDF_EXTRACTION_MODE'] == 'budgeted':
+            return extract_text_from_pdf_budgeted(file_path)
+        return extract_text_from_pdf(file_path), None
     elif file_extension in ['docx', 'doc']:
-        return extract_text_from_docx(file_path)
+        return extract_text_from_docx(file_path), None
     elif file_extension == 'csv':
-        return extract_text_from_csv(file_path)
+        return extract_text_from_csv(file_path), None
     elif file_extension in ['txt', 'rtf']:
-        return extract_text_from_txt(file_path)
-    return ""
+        return extract_text_from_txt(file_path), None
+    return "", None
 
-# Function to Extract Resume Details using Gemini AI
-def parse_resume_with_ai(resume_text):
-    prompt = f"""
-    You are a resume parsing assistant. Extract details from the following resume text and return them in structured JSON format.
+# Process pool for batch text extraction, created on first use
+extraction_pool = None
+extraction_pool_lock = threading.Lock()
+
+def get_extraction_pool():
+    global extraction_pool
+    with extraction_pool_lock:
+        if extraction_pool is None:
+            extraction_pool = ProcessPoolExecutor(max_workers=app.config['EXTRACTION_WORKERS'])
+        return extraction_pool
+
+def reset_extraction_pool():
+    global extraction_pool
+    with extraction_pool_lock:
+        if extraction_pool is not None:
+            extraction_pool.shutdown(wait=False)
+        extraction_pool = None
+
+def extract_text_or_none(filename, data):
+    try:
+        return extract_text_from_bytes(data, filename)
+    except Exception as e:
+        print(f"Error extracting text from {filename}: {e}")
+        return None
+
+# Extract text from several in-memory files in parallel, keeping the input order
+def extract_texts(documents):
+    """Return (text, truncation) for each (filename, data) pair, or None where extraction failed"""
+    if app.config['EXTRACTION_WORKERS'] <= 1 or len(documents) <= 1:
+        return [extract_text_or_none(filename, data) for filename, data in documents]
     
-    ### Resume Text:
-    {resume_text}
+    try:
+        pool = get_extraction_pool()
+        futures = [pool.submit(extract_text_from_bytes, data, filename) for filename, data in documents]
+    except Exception as e:
+        print(f"Extraction pool unavailable, extracting serially: {e}")
+        reset_extraction_pool()
+        return [extract_text_or_none(filename, data) for filename, data in documents]
     
-    ### Return JSON Format:
-    {{
+    texts = []
+    for (filename, data), future in zip(documents, futures):
+        try:
+            texts.append(future.result())
+        except BrokenProcessPool as e:
+            print(f"Extraction worker crashed on {filename}: {e}")
+            reset_extraction_pool()
+            texts.append(None)
+        except Exception as e:
+            print(f"Error extracting text from {filename}: {e}")
+            texts.append(None)
+    return texts
+
+# Helper function to read an uploaded file from its in-memory or spooled stream
+def read_upload(file):
+    file.stream.seek(0)
+    return file.stream.read()
+
+# Write a CV file to its final location exactly once, publishing it with an atomic rename
+def save_cv_file(data, cv_filename):
+    cv_file_path = os.path.join(app.config['CV_FOLDER'], cv_filename)
+    if os.path.exists(cv_file_path):
+        # Content-addressed file already stored; refresh its mtime so GC treats it as in use
+        os.utime(cv_file_path)
+        return cv_file_path
+    
+    temp_path = os.path.join(app.config['CV_FOLDER'], f".{cv_filename}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, cv_file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return cv_file_path
+
+# Count the resume records that reference a stored CV file
+def count_cv_references(cv_filename):
+    if mongodb_available:
+        ensure_resume_collection()
+        return resumes_collection.count_documents({'cv_filename': cv_filename})
+    return resumes_data.count_cv_references(cv_filename)
+
+# Delete a stored CV file once no resume record references it
+def release_cv_file(cv_filename):
+    if not cv_filename:
+        return False
+    try:
+        if count_cv_references(cv_filename) > 0:
+            return False
+        cv_file_path = os.path.join(app.config['CV_FOLDER'], cv_filename)
+        if not os.path.exists(cv_file_path):
+            return False
+        # A recent file may belong to an upload whose record is not inserted yet
+        if time.time() - os.path.getmtime(cv_file_path) < app.config['CV_GC_GRACE_SECONDS']:
+            return False
+        os.remove(cv_file_path)
+        print(f"Removed unreferenced CV file: {cv_filename}")
+        return True
+    except Exception as e:
+        print(f"Error releasing CV file {cv_filename}: {e}")
+        return False
+
+# Remove CV files that no resume record references
+def collect_orphaned_cv_files():
+    if mongodb_available:
+        referenced = set(resumes_collection.distinct('cv_filename'))
+    else:
+        referenced = resumes_data.cv_filenames()
+    
+    removed = []
+    now = time.time()
+    for entry in os.scandir(app.config['CV_FOLDER']):
+        if not entry.is_file() or entry.name in referenced:
+            continue
+        if now - entry.stat().st_mtime < app.config['CV_GC_GRACE_SECONDS']:
+            continue
+        try:
+            os.remove(entry.path)
+            removed.append(entry.name)
+        except Exception as e:
+            print(f"Error removing orphaned CV file {entry.name}: {e}")
+    return removed
+
+ai_cache = DiskCache(app.config['AI_CACHE_FOLDER'], app.config['AI_CACHE_MAX_BYTES'], app.config['AI_CACHE_TTL_SECONDS'])
+
+# Paces Gemini requests to a steady rate, allowing a short burst
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+    
+    def __init__(self, rate_per_second, capacity):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        if self.rate_per_second <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate_per_second
+            time.sleep(wait)
+
+ai_rate_limiter = TokenBucket(app.config['AI_REQUESTS_PER_MINUTE'] / 60.0, max(1, app.config['AI_MAX_IN_FLIGHT']))
+ai_in_flight = threading.BoundedSemaphore(max(1, app.config['AI_MAX_IN_FLIGHT']))
+
+class CircuitOpenError(Exception):
+    pass
+
+# Stops calling a failing or slow dependency until it has had time to recover
+class CircuitBreaker:
+    """Opens when the error rate or p95 latency over a rolling window crosses its threshold.
+    While open, calls are rejected; after open_seconds a few probe calls are let through
+    (half-open), and the breaker closes again once they all succeed. Only those probes decide
+    the half-open outcome; calls admitted before the breaker opened just join the window."""
+    
+    def __init__(self, window_seconds, min_calls, error_rate_threshold, p95_threshold, open_seconds, half_open_probes):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.p95_threshold = p95_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = 'closed'
+        self.calls = deque()  # (finished_at, succeeded, latency)
+        self.opened_at = None
+        self.generation = 0  # Bumped on every open, so probes from an earlier half-open are ignored
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.counters = {'calls': 0, 'failures': 0, 'rejected': 0, 'times_opened': 0}
+        self.lock = threading.Lock()
+    
+    def _prune(self, now):
+        while self.calls and now - self.calls[0][0] > self.window_seconds:
+            self.calls.popleft()
+    
+    def _open(self, now):
+        self.state = 'open'
+        self.opened_at = now
+        self.generation += 1
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.counters['times_opened'] += 1
+        print(f"AI circuit breaker opened: {self._window_stats()}")
+    
+    def _window_stats(self):
+        latencies = sorted(latency for finished_at, succeeded, latency in self.calls)
+        failures = sum(1 for finished_at, succeeded, latency in self.calls if not succeeded)
+        return {
+            'calls': len(self.calls),
+            'error_rate': round(failures / len(self.calls), 4) if self.calls else 0.0,
+            'p95_seconds': round(latencies[math.ceil(0.95 * len(latencies)) - 1], 3) if latencies else 0.0
+        }
+    
+    def is_open(self):
+        with self.lock:
+            return self.state == 'open' and time.monotonic() - self.opened_at < self.open_seconds
+    
+    def allow_request(self):
+        """Return (allowed, probe). probe is None for an ordinary call, and must be passed
+        back to record() for a call admitted as a half-open probe."""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == 'open':
+                if now - self.opened_at < self.open_seconds:
+                    self.counters['rejected'] += 1
+                    return False, None
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self.probes_in_flight >= self.half_open_probes:
+                    self.counters['rejected'] += 1
+                    return False, None
+                self.probes_in_flight += 1
+                return True, self.generation
+            return True, None
+    
+    def record(self, succeeded, latency, probe=None):
+        with self.lock:
+            now = time.monotonic()
+            self.counters['calls'] += 1
+            if not succeeded:
+                self.counters['failures'] += 1
+            
+            if self.state == 'half_open' and probe == self.generation:
+                self.probes_in_flight -= 1
+                if not succeeded or latency > self.p95_threshold:
+                    self._open(now)
+                    return
+                self.probe_successes += 1
+                if self.probe_successes >= self.half_open_probes:
+                    self.state = 'closed'
+                    self.calls.clear()
+                    print("AI circuit breaker closed")
+                return
+            
+            self.calls.append((now, succeeded, latency))
+            self._prune(now)
+            if self.state == 'closed' and len(self.calls) >= self.min_calls:
+                stats = self._window_stats()
+                if stats['error_rate'] >= self.error_rate_threshold or stats['p95_seconds'] > self.p95_threshold:
+                    self._open(now)
+    
+    def status(self):
+        with self.lock:
+            self._prune(time.monotonic())
+            return dict(
+                self.counters,
+                state=self.state,
+                window=self._window_stats(),
+                seconds_until_half_open=max(0.0, round(self.open_seconds - (time.monotonic() - self.opened_at), 1))
+                if self.state == 'open' else 0.0
+            )
+
+ai_circuit_breaker = CircuitBreaker(
+    app.config['AI_BREAKER_WINDOW_SECONDS'],
+    app.config['AI_BREAKER_MIN_CALLS'],
+    app.config['AI_BREAKER_ERROR_RATE'],
+    app.config['AI_BREAKER_P95_SECONDS'],
+    app.config['AI_BREAKER_OPEN_SECONDS'],
+    app.config['AI_BREAKER_HALF_OPEN_PROBES']
+)
+
+# Call the LLM backend within the process-wide rate and concurrency limits, retrying transient failures
+def generate_ai_content(prompt):
+    max_retries = app.config['AI_MAX_RETRIES']
+    for attempt in range(max_retries + 1):
+        allowed, probe = ai_circuit_breaker.allow_request()
+        if not allowed:
+            raise CircuitOpenError("AI circuit breaker is open")
+        ai_rate_limiter.acquire()
+        with ai_in_flight:
+            start_time = time.monotonic()
+            try:
+                response = llm_backend.generate(prompt, app.config['AI_CALL_TIMEOUT'])
+            except Exception as e:
+                ai_circuit_breaker.record(False, time.monotonic() - start_time, probe)
+                error = e
+            else:
+                ai_circuit_breaker.record(True, time.monotonic() - start_time, probe)
+                return response
+        
+        if not isinstance(error, RETRYABLE_AI_ERRORS) or attempt >= max_retries:
+            raise error
+        # Full jitter keeps concurrent retries from arriving in lockstep
+        delay = random.uniform(0, app.config['AI_RETRY_BASE_DELAY'] * (2 ** attempt))
+        print(f"Gemini call failed ({error}); retrying in {delay:.2f}s")
+        time.sleep(delay)
+
+# JSON shape requested from Gemini, shared by the single and batched prompts
+AI_RESPONSE_FORMAT = """{
       "Full Name": "John Doe",
       "Contact Number": "123-456-7890",
       "Email Address": "johndoe@example.com",
       "Location": "New York, USA",
       "LinkedIn": "https://www.linkedin.com/in/johndoe",
       "GitHub": "https://github.com/johndoe",
-      "Skills": {{ "Technical": ["Python", "Java"], "Soft": ["Communication"] }},
-      "Education": [{{ "Degree": "B.Sc. Computer Science", "Institution": "XYZ University", "Years": "2015-2019" }}],
-      "Work Experience": [{{ "Company": "ABC Corp", "Role": "Software Engineer", "Years": "3" }}],
+      "Skills": { "Technical": ["Python", "Java"], "Soft": ["Communication"] },
+      "Education": [{ "Degree": "B.Sc. Computer Science", "Institution": "XYZ University", "Years": "2015-2019" }],
+      "Work Experience": [{ "Company": "ABC Corp", "Role": "Software Engineer", "Years": "3" }],
       "Certifications": ["AWS Certified Developer"],
       "Languages": ["English", "Spanish"],
       "Suggested Category": "Software Development",
       "Recommended Roles": ["Backend Developer", "Full Stack Developer"]
-    }}
-    
-    IMPORTANT: For the Full Name field, make sure to extract ONLY the person's name without any prefixes like "Contact" or "Name:". For LinkedIn URL, extract the COMPLETE URL including https://www.linkedin.com/in/ part.
-    """
+    }"""
+
+AI_RESPONSE_EXAMPLE = json.loads(AI_RESPONSE_FORMAT)
+
+AI_PROMPT_INSTRUCTIONS = 'IMPORTANT: For the Full Name field, make sure to extract ONLY the person\'s name without any prefixes like "Contact" or "Name:". For LinkedIn URL, extract the COMPLETE URL including https://www.linkedin.com/in/ part.'
+
+# Cache key for parsed AI output: normalized resume text plus backend model and prompt version
+def ai_cache_key(resume_text, fields=None):
+    """fields scopes the key to a field-level request from the hybrid parser"""
+    normalized = re.sub(r'\s+', ' ', resume_text or '').strip()
+    scope = f"fields={','.join(fields)}:" if fields else ""
+    model_name = llm_backend.name if llm_backend else AI_MODEL_NAME
+    return hashlib.sha256(f"{model_name}:{AI_PROMPT_VERSION}:{scope}{normalized}".encode('utf-8')).hexdigest()
+
+# Send a prompt to Gemini and parse the JSON object in its reply, using the AI cache when enabled
+def generate_ai_json(prompt, cache_key=None):
+    if cache_key:
+        cached = ai_cache.get(cache_key)
+        if cached is not None:
+            return cached
     
     try:
-        response = model.generate_content(prompt).text
+        response = generate_ai_content(prompt)
         json_match = re.search(r"\{.*\}", response, re.DOTALL)
         if json_match:
             response_clean = json_match.group(0)
-            return json.loads(response_clean)
+            ai_resume_data = json.loads(response_clean)
+            if cache_key and isinstance(ai_resume_data, dict):
+                ai_cache.set(cache_key, ai_resume_data)
+            return ai_resume_data
         else:
             return {"error": "No valid JSON detected in AI response"}
     except json.JSONDecodeError:
@@ -207,6 +1048,107 @@ def parse_resume_with_ai(resume_text):
     except Exception as e:
         return {"error": str(e)}
 
+# Function to Extract Resume Details using Gemini AI
+def parse_resume_with_ai(resume_text):
+    cache_key = ai_cache_key(resume_text) if app.config['AI_CACHE_MAX_BYTES'] > 0 else None
+    
+    prompt = f"""
+    You are a resume parsing assistant. Extract details from the following resume text and return them in structured JSON format.
+    
+    ### Resume Text:
+    {resume_text}
+    
+    ### Return JSON Format:
+    {AI_RESPONSE_FORMAT}
+    
+    {AI_PROMPT_INSTRUCTIONS}
+    """
+    
+    return generate_ai_json(prompt, cache_key)
+
+# Ask Gemini for just the named fields, used by hybrid parsing for low-confidence fields
+def parse_resume_fields_with_ai(resume_text, fields):
+    cache_key = ai_cache_key(resume_text, fields) if app.config['AI_CACHE_MAX_BYTES'] > 0 else None
+    response_format = json.dumps({field: AI_RESPONSE_EXAMPLE[field] for field in fields}, indent=2)
+    
+    prompt = f"""
+    You are a resume parsing assistant. Extract ONLY the following fields from the resume text below: {", ".join(fields)}.
+    Return a JSON object with exactly these keys, using an empty string or empty list when a field is not present.
+    
+    ### Resume Text:
+    {resume_text}
+    
+    ### Return JSON Format:
+    {response_format}
+    
+    {AI_PROMPT_INSTRUCTIONS}
+    """
+    
+    return generate_ai_json(prompt, cache_key)
+
+# Helper function to check that a parsed AI result looks like a resume
+def is_valid_ai_resume(ai_resume_data):
+    return (isinstance(ai_resume_data, dict) and "error" not in ai_resume_data
+            and any(key in ai_resume_data for key in ("Full Name", "Email Address", "Contact Number")))
+
+# Parse several resumes with a single Gemini request
+def parse_resumes_with_ai_batch(resume_texts):
+    """Return one parsed dict per input text, in order. Cached texts are not sent, and any
+    item missing or invalid in the batched reply is re-parsed on its own."""
+    results = [None] * len(resume_texts)
+    cache_keys = [None] * len(resume_texts)
+    pending = []
+    for index, resume_text in enumerate(resume_texts):
+        if app.config['AI_CACHE_MAX_BYTES'] > 0:
+            cache_keys[index] = ai_cache_key(resume_text)
+            cached = ai_cache.get(cache_keys[index])
+            if cached is not None:
+                results[index] = cached
+                continue
+        pending.append(index)
+    
+    if len(pending) > 1:
+        resumes_block = "\n".join(
+            f"=== RESUME {number} START ===\n{resume_texts[index]}\n=== RESUME {number} END ==="
+            for number, index in enumerate(pending, 1)
+        )
+        prompt = f"""
+    You are a resume parsing assistant. The text below contains {len(pending)} separate resumes, each between its own START and END markers.
+    Extract details from each resume and return a JSON array with exactly one object per resume, in the same order.
+    Each object must include "Resume Number" (the number from its markers) and follow this format:
+    {AI_RESPONSE_FORMAT}
+    
+    {AI_PROMPT_INSTRUCTIONS}
+    
+    ### Resumes:
+    {resumes_block}
+    """
+        
+        try:
+            response = generate_ai_content(prompt)
+            array_match = re.search(r"\[.*\]", response, re.DOTALL)
+            items = json.loads(array_match.group(0)) if array_match else []
+            for item in items if isinstance(items, list) else []:
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    number = int(item.pop("Resume Number"))
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if 1 <= number <= len(pending):
+                    results[pending[number - 1]] = item
+        except Exception as e:
+            print(f"Batched AI parsing failed, parsing resumes individually: {e}")
+    
+    for index in pending:
+        if len(pending) > 1 and is_valid_ai_resume(results[index]):
+            if cache_keys[index]:
+                ai_cache.set(cache_keys[index], results[index])
+        else:
+            results[index] = parse_resume_with_ai(resume_texts[index])
+    
+    return results
+
 # Section identification patterns
 SECTION_PATTERNS = {
     'personal_info': [r'personal\s+information', r'contact\s+information', r'contact', r'personal', r'about\s+me'],
@@ -273,30 +1215,369 @@ GITHUB_PATTERNS = [
     r'(?:^|\s)(github\.com/[a-zA-Z0-9_-]+)',  # URL without protocol at start or after space
 ]
 
-# Lists of common skills for better detection
-TECHNICAL_SKILLS = [
-    "Python", "JavaScript", "Java", "C++", "C#", "PHP", "Ruby", "Swift", "Kotlin", "Go",
-    "React", "Angular", "Vue.js", "Node.js", "Express", "Django", "Flask", "Spring Boot",
-    "HTML", "CSS", "SQL", "MongoDB", "PostgreSQL", "MySQL", "Oracle", "Firebase",
-    "AWS", "Azure", "Google Cloud", "Docker", "Kubernetes", "Git", "CI/CD",
-    "Machine Learning", "Data Science", "Artificial Intelligence", "Deep Learning",
-    "TensorFlow", "PyTorch", "Pandas", "NumPy", "Scikit-learn", "R", "Tableau", "Power BI",
-    "Mobile Development", "Web Development", "Full Stack", "Frontend", "Backend", "DevOps",
-    "Agile", "Scrum", "REST API", "GraphQL", "Microservices", "Linux", "Windows",
-    "Networking", "Security", "Blockchain", "IoT", "AR/VR", "Game Development",
-    "Solidity", "Ethereum", "Smart Contracts", "Web3", "DApp", "Hardhat", "Truffle",
-    "Project Management", "Digital Marketing", "Teamwork", "Time Management", "Leadership",
-    "Effective Communication", "Critical Thinking", "Problem Solving", "Analytical Skills"
+# Patterns used by the education and experience extractors
+EDUCATION_DEGREE_PATTERNS = [
+    r'(?:bachelor|master|phd|b\.?s\.?|m\.?s\.?|b\.?e\.?|b\.?tech|m\.?tech)[^,\n]*',
+    r'(?:degree)[^,\n]*'
+]
+
+EDUCATION_INSTITUTION_PATTERNS = [
+    r'(?:university|college|institute|school)[^,\n]*'
+]
+
+EDUCATION_YEAR_PATTERNS = [
+    r'(?:20\d{2})\s*-\s*(?:20\d{2}|present|ongoing)',
+    r'(?:19\d{2})\s*-\s*(?:20\d{2}|present|ongoing)',
+    r'(?:20\d{2})',
+    r'(?:19\d{2})'
+]
+
+EDUCATION_FIELD_PATTERNS = [
+    r'(?:in|of)\s+([A-Za-z\s&]+)'
+]
+
+EXPERIENCE_ENTRY_START_PATTERNS = [
+    (r'(?:20\d{2}|19\d{2})\s*-\s*(?:20\d{2}|19\d{2}|present|ongoing)', re.IGNORECASE),
+    (r'^[A-Z][a-zA-Z\s&]+,', 0),
+    (r'^[A-Z][a-zA-Z\s&]+\s+\|', 0),
+    (r'^(?:senior|junior|lead|principal|software|web|mobile|data|cloud|devops|full\s+stack|front\s*end|back\s*end)\s+', re.IGNORECASE)
+]
+
+EXPERIENCE_COMPANY_PATTERNS = [
+    r'(?:at|with|for)?\s*([A-Za-z0-9\s&.,]+?)(?:\n|\s{2,}|$)',
+    r'(?:company|employer)[:\s]+([A-Za-z0-9\s&.,]+)',
+    r'^([A-Z][a-zA-Z\s&]+),',
+    r'^([A-Z][a-zA-Z\s&]+)\s+\|'
 ]
 
-SOFT_SKILLS = [
-    "Communication", "Leadership", "Teamwork", "Problem Solving", "Critical Thinking",
-    "Time Management", "Adaptability", "Creativity", "Project Management", "Collaboration",
-    "Attention to Detail", "Organization", "Analytical Skills", "Interpersonal Skills",
-    "Presentation Skills", "Negotiation", "Conflict Resolution", "Decision Making",
-    "Emotional Intelligence", "Flexibility"
+EXPERIENCE_ROLE_PATTERNS = [
+    r'(?:as|position|role|title)[:\s]+([A-Za-z\s]+)',
+    r'(?:senior|junior|lead|principal|software|web|mobile|data|cloud|devops|full\s+stack|front\s*end|back\s*end)\s+([A-Za-z\s]+)',
+    r'([A-Za-z\s]+?)\s+(?:developer|engineer|analyst|manager|consultant|designer|architect)'
 ]
 
+EXPERIENCE_YEAR_PATTERNS = [
+    r'(?:20\d{2}|19\d{2})\s*-\s*(?:20\d{2}|19\d{2}|present|ongoing)',
+    r'(?:from|since)\s+(?:20\d{2}|19\d{2})',
+    r'(?:20\d{2}|19\d{2})'
+]
+
+# Linear-time replacements for patterns that backtrack for seconds on long runs of letters or
+# whitespace. Each finds the same first match as the original (with the original's whole match
+# captured as group 1 where it had no group), which is all the extractors read via search().
+LINEAR_PATTERN_REWRITES = {
+    # Leading and trailing \s* crossed blank lines, so every line start in a run of them rescanned
+    # the run. The group starts at a capital, hence on the last line start before it.
+    NAME_PATTERNS[0]: r'^[^\S\n]*([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})[^\S\n]*$',
+    # Only the first line start after non-blank text is tried, since later ones in the same blank
+    # run can only fail where it failed. The alternatives are the group's possible starts in the
+    # order the original backtracks into them: the first non-blank character, the blank before
+    # it, or the two blanks before the last newline of the run (or before the end of the text).
+    NAME_PATTERNS[8]: (r'(?:\A|(?<=\S)[^\S\n]*\n)\s*('
+                       r'[A-Za-z.][A-Za-z.\s]{1,29}(?=[^\S\n]*(?:\n|\Z))'
+                       r'|\s[A-Za-z.](?=[^\S\n]*(?:\n|\Z))'
+                       r'|\s\s(?=\Z|\n[^\S\n]*\S))'),
+    # Every word boundary in a long run of address characters rescanned the run looking for @.
+    # The lookahead rejects a run once; the match then starts at the run's first boundary.
+    EMAIL_PATTERNS[0]: (r'(?<![A-Za-z0-9._%+-])(?=[A-Za-z0-9._%+-]*@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)'
+                        r'[A-Za-z0-9._%+-]*?\b([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)'),
+    # If a run of these characters has no match from its first character it has none from any
+    # later one, so only run starts are tried
+    EXPERIENCE_COMPANY_PATTERNS[0]: r'(?<![A-Za-z0-9\s&.,])(?:at|with|for)?\s*([A-Za-z0-9\s&.,]+?)(?:\n|\s{2,}|$)',
+    # Likewise for runs of letters and whitespace, and the lazy group now ends on a letter (or is a
+    # single blank) so \s+ is entered once per blank run instead of at every blank in it
+    EXPERIENCE_ROLE_PATTERNS[2]: (r'(?<![A-Za-z\s])(\s|[A-Za-z\s]*?[A-Za-z])\s+'
+                                  r'(?:developer|engineer|analyst|manager|consultant|designer|architect)'),
+}
+
+# CPU time allowed for the regex work on one resume, charged to the thread doing the parse
+class RegexBudget:
+    CHECK_INTERVAL = 16  # Calls between clock reads; reading the thread clock costs more than a short search
+    
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.deadline = time.thread_time() + seconds
+        self.calls = 0
+        self.exhausted = False
+    
+    def allows_call(self):
+        if self.exhausted:
+            return False
+        self.calls += 1
+        if self.seconds and self.calls % self.CHECK_INTERVAL == 0 and time.thread_time() > self.deadline:
+            self.exhausted = True
+        return not self.exhausted
+
+current_regex_budget = contextvars.ContextVar('current_regex_budget', default=None)
+
+@contextlib.contextmanager
+def regex_budget(seconds):
+    """Charge guarded pattern calls in this block to a new RegexBudget"""
+    budget = RegexBudget(seconds)
+    token = current_regex_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        current_regex_budget.reset(token)
+
+class GuardedPattern:
+    """A compiled pattern that looks at no more than PARSER_MAX_REGEX_INPUT characters and
+    finds nothing once the current RegexBudget is spent. Together with the linear rewrites
+    this bounds the time any resume can spend in the rule-based parser."""
+    
+    def __init__(self, regex):
+        self.regex = regex
+        self.pattern = regex.pattern
+        self.flags = regex.flags
+        self.groups = regex.groups
+    
+    def _guarded_input(self, string):
+        budget = current_regex_budget.get()
+        if budget is not None and not budget.allows_call():
+            return None
+        return string[:app.config['PARSER_MAX_REGEX_INPUT']]
+    
+    def search(self, string):
+        string = self._guarded_input(string)
+        return None if string is None else self.regex.search(string)
+    
+    def match(self, string):
+        string = self._guarded_input(string)
+        return None if string is None else self.regex.match(string)
+    
+    def findall(self, string):
+        string = self._guarded_input(string)
+        return [] if string is None else self.regex.findall(string)
+    
+    def finditer(self, string):
+        string = self._guarded_input(string)
+        return iter(()) if string is None else self.regex.finditer(string)
+
+def compile_pattern(pattern, flags=0):
+    return GuardedPattern(re.compile(LINEAR_PATTERN_REWRITES.get(pattern, pattern), flags))
+
+def compile_patterns(patterns, flags=0):
+    return [compile_pattern(pattern, flags) for pattern in patterns]
+
+# The text findall() would list first: the first group, or the whole match for a pattern without one
+def first_match_text(pattern, text):
+    match = pattern.search(text)
+    if not match:
+        return None
+    return (match.group(1) if pattern.groups else match.group(0)) or ""
+
+# One pattern for every section header. The lookahead lets finditer report each position
+# where some header starts, naming the first section in SECTION_PATTERNS order that matches there.
+def compile_section_matcher(section_patterns):
+    alternatives = '|'.join(f"(?P<{section}>{'|'.join(patterns)})" for section, patterns in section_patterns.items())
+    return re.compile(f"(?=(?:{alternatives}))", re.IGNORECASE)
+
+SECTION_PRIORITY = {section: index for index, section in enumerate(SECTION_PATTERNS)}
+
+# Pattern registry: every rule-based pattern compiled once, with the flags its extractor uses.
+# Extractors look patterns up here instead of handing strings to the re module on every call.
+# Entries are GuardedPatterns, with LINEAR_PATTERN_REWRITES substituted where they apply.
+PATTERN_REGISTRY = {
+    'section_header': GuardedPattern(compile_section_matcher(SECTION_PATTERNS)),
+    'name': compile_patterns(NAME_PATTERNS, re.MULTILINE),
+    'name_exclusion': compile_pattern(r'resume|cv|curriculum|vitae', re.IGNORECASE),
+    'email': compile_patterns(EMAIL_PATTERNS),
+    'phone': compile_patterns(PHONE_PATTERNS),
+    'location': compile_patterns(LOCATION_PATTERNS, re.IGNORECASE),
+    'linkedin': compile_patterns(LINKEDIN_PATTERNS, re.IGNORECASE),
+    'github': compile_patterns(GITHUB_PATTERNS, re.IGNORECASE),
+    'linkedin_username_in_url': compile_pattern(r'linkedin\.com/in/([a-zA-Z0-9_-]+)'),
+    'linkedin_username': compile_pattern(r'^[a-zA-Z0-9_-]{3,100}$'),
+    'github_username_in_url': compile_pattern(r'github\.com/([a-zA-Z0-9_-]+)'),
+    'github_username': compile_pattern(r'^[a-zA-Z0-9_-]{1,39}$'),
+    'education_keyword': compile_pattern(r'degree|bachelor|master|phd|university|college|institute|school', re.IGNORECASE),
+    'education_degree': compile_patterns(EDUCATION_DEGREE_PATTERNS, re.IGNORECASE),
+    'education_institution': compile_patterns(EDUCATION_INSTITUTION_PATTERNS, re.IGNORECASE),
+    'education_year': compile_patterns(EDUCATION_YEAR_PATTERNS, re.IGNORECASE),
+    'education_field': compile_patterns(EDUCATION_FIELD_PATTERNS, re.IGNORECASE),
+    'experience_entry_start': [compile_pattern(pattern, flags) for pattern, flags in EXPERIENCE_ENTRY_START_PATTERNS],
+    'experience_company': compile_patterns(EXPERIENCE_COMPANY_PATTERNS, re.IGNORECASE),
+    'experience_role': compile_patterns(EXPERIENCE_ROLE_PATTERNS, re.IGNORECASE),
+    'experience_year': compile_patterns(EXPERIENCE_YEAR_PATTERNS, re.IGNORECASE),
+    'role_keyword': compile_pattern(r'developer|engineer|analyst|manager|consultant|designer|architect', re.IGNORECASE),
+    'role_suffix': compile_pattern(r'(developer|engineer|analyst|manager|consultant|designer|architect)', re.IGNORECASE),
+    'project_title': compile_pattern(r'^[A-Z]')
+}
+
+# Characters that re.IGNORECASE treats as ASCII letters but str.lower() does not fold to them
+CASE_FOLD_FIXUPS = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's'})
+
+# Lower-case text one character per character, so positions line up with the original
+def fold_case(text):
+    folded = text.translate(CASE_FOLD_FIXUPS).lower()
+    if len(folded) != len(text):
+        folded = ''.join(char if len(char.lower()) != 1 else char.lower() for char in text)
+    return folded
+
+def is_word_char(char):
+    return char.isalnum() or char == '_'
+
+class SkillMatcher:
+    """Case-insensitive Aho-Corasick automaton over (term, value) pairs. One pass over the
+    text finds every term that re.search(r'\b' + re.escape(term) + r'\b', text,
+    re.IGNORECASE) would find, whatever the number of terms."""
+    
+    def __init__(self, terms):
+        self.values = []  # Value of each term, in the order given
+        goto = [{}]  # Trie edges
+        self.fail = [0]
+        self.outputs = [[]]  # (term index, length) for every term ending at a node
+        
+        for term, value in terms:
+            folded = fold_case(term)
+            if not folded:
+                continue
+            node = 0
+            for char in folded:
+                if char not in goto[node]:
+                    goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    goto[node][char] = len(goto) - 1
+                node = goto[node][char]
+            self.outputs[node].append((len(self.values), len(folded)))
+            self.values.append(value)
+        
+        # Breadth-first, so a node's failure target is complete before the node itself
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = goto[fallback].get(char, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+                queue.append(child)
+        
+        # Full transitions, filled in lazily so each text character costs one dict lookup
+        self.transitions = [dict(edges) for edges in goto]
+    
+    def step(self, node, char):
+        next_node = self.transitions[node].get(char)
+        if next_node is None:
+            next_node = self.step(self.fail[node], char) if node else 0
+            self.transitions[node][char] = next_node
+        return next_node
+    
+    def find(self, text, folded_text=None):
+        """Return the values of the matched terms in term order, without duplicates.
+        folded_text may be passed when fold_case(text) is already at hand."""
+        transitions, outputs = self.transitions, self.outputs
+        found = set()
+        node = 0
+        if folded_text is None:
+            folded_text = fold_case(text)
+        for end, char in enumerate(folded_text, 1):
+            next_node = transitions[node].get(char)
+            node = self.step(node, char) if next_node is None else next_node
+            for entry, length in outputs[node]:
+                if entry in found:
+                    continue
+                start = end - length
+                # \b on both sides: word-ness must change across each edge of the match
+                before = start > 0 and is_word_char(text[start - 1])
+                after = end < len(text) and is_word_char(text[end])
+                if before != is_word_char(text[start]) and after != is_word_char(text[end - 1]):
+                    found.add(entry)
+        
+        values = []
+        for entry in sorted(found):
+            if self.values[entry] not in values:
+                values.append(self.values[entry])
+        return values
+
+SKILL_CATEGORIES = ("Technical", "Soft")
+
+class SkillTaxonomy:
+    """Skills, aliases, categories and role links from a taxonomy file, compiled into integer
+    skill IDs. IDs follow file order. Skills are reported in the order category_order lists
+    them for their category, or in file order for a category it does not list."""
+    
+    def __init__(self, taxonomy):
+        self.names = []  # Canonical name per skill ID
+        self.categories = []  # Tuple of categories per skill ID
+        self.role_ids = []  # Tuple of role IDs per skill ID
+        self.roles = []  # Name per role ID
+        self.ids_by_name = {}  # Folded canonical name or alias -> skill ID
+        role_ids_by_name = {}
+        terms = []
+        
+        for skill in taxonomy['skills']:
+            skill_id = len(self.names)
+            categories = tuple(skill.get('categories', ()))
+            if not categories or any(category not in SKILL_CATEGORIES for category in categories):
+                raise ValueError(f"Skill {skill['name']!r} needs categories from {SKILL_CATEGORIES}")
+            
+            role_ids = []
+            for role in skill.get('roles', ()):
+                if role not in role_ids_by_name:
+                    role_ids_by_name[role] = len(self.roles)
+                    self.roles.append(role)
+                role_ids.append(role_ids_by_name[role])
+            
+            for surface in [skill['name']] + list(skill.get('aliases', ())):
+                key = fold_case(surface.strip())
+                if self.ids_by_name.get(key, skill_id) != skill_id:
+                    raise ValueError(f"{surface!r} is listed for more than one skill")
+                self.ids_by_name[key] = skill_id
+                terms.append((surface, skill_id))
+            
+            self.names.append(skill['name'])
+            self.categories.append(categories)
+            self.role_ids.append(tuple(role_ids))
+        
+        # Report position of each skill ID within each category
+        self.category_ranks = {}
+        for category in SKILL_CATEGORIES:
+            skill_ids = [skill_id for skill_id, categories in enumerate(self.categories) if category in categories]
+            if category in taxonomy.get('category_order', {}):
+                ordered_ids = [self.skill_id(name) for name in taxonomy['category_order'][category]]
+                if None in ordered_ids or sorted(ordered_ids) != skill_ids:
+                    raise ValueError(f"category_order for {category} must list each of its skills once")
+                skill_ids = ordered_ids
+            self.category_ranks[category] = {skill_id: rank for rank, skill_id in enumerate(skill_ids)}
+        
+        self.matcher = SkillMatcher(terms)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as file:
+            return cls(json.load(file))
+    
+    def skill_id(self, name):
+        """Skill ID for a canonical name or alias, or None"""
+        if not isinstance(name, str):
+            return None
+        return self.ids_by_name.get(fold_case(name.strip()))
+    
+    def find_skill_ids(self, text, folded_text=None):
+        return self.matcher.find(text, folded_text)
+    
+    def skill_names(self, category):
+        ranks = self.category_ranks[category]
+        return [self.names[skill_id] for skill_id in sorted(ranks, key=ranks.__getitem__)]
+    
+    def categorize(self, skill_ids):
+        skill_ids = list(skill_ids)
+        skills = {}
+        for category in SKILL_CATEGORIES:
+            ranks = self.category_ranks[category]
+            skills[category] = [self.names[skill_id] for skill_id in sorted(
+                (skill_id for skill_id in skill_ids if skill_id in ranks), key=ranks.__getitem__)]
+        return skills
+
+SKILL_TAXONOMY = SkillTaxonomy.load(app.config['SKILL_TAXONOMY_FILE'])
+
+# Canonical skill names per category, in report order
+TECHNICAL_SKILLS = SKILL_TAXONOMY.skill_names("Technical")
+SOFT_SKILLS = SKILL_TAXONOMY.skill_names("Soft")
+
 # Function to normalize and clean data for comparison
 def normalize_text(text):
     if not text or not isinstance(text, str):
@@ -315,15 +1596,85 @@ def normalize_email(email):
         return ""
     return email.strip().lower()
 
+# Normalized identity fields, stored on each record as dedup_keys and indexed in MongoDB
+def duplicate_keys(resume_data):
+    """Keys in match priority order: a name match is reported before an email or phone match"""
+    return {
+        "name": normalize_text(resume_data.get("Full Name", "")),
+        "email": normalize_email(resume_data.get("Email Address", "")),
+        "phone": normalize_phone(resume_data.get("Contact Number", ""))
+    }
+
+# The first key, in priority order, that two records share; "" if they are not duplicates
+def duplicate_match_reason(keys, existing_keys):
+    return next((field for field, value in keys.items() if value and existing_keys.get(field) == value), "")
+
+# Only the fields reported in duplicates_info are fetched for matching records
+DUPLICATE_PROJECTION = ["filename", "Full Name", "Email Address", "Contact Number", "cv_filename", "dedup_keys"]
+
+# Create the indexes behind the duplicate lookup; each key is queried on its own inside an $or
+def create_resume_indexes():
+    for field in ("name", "email", "phone"):
+        resumes_collection.create_index(f"dedup_keys.{field}")
+    # Deleting a resume counts the records still pointing at its CV file
+    resumes_collection.create_index("cv_filename")
+
+# Store dedup_keys on records saved before duplicate detection used them; returns how many
+def backfill_dedup_keys():
+    updated = 0
+    updates = []
+    # Stored keys are always strings, so null matches exactly the records without them
+    for resume in resumes_collection.find({"dedup_keys.name": None}, ["Full Name", "Email Address", "Contact Number"]):
+        updates.append(UpdateOne({"_id": resume["_id"]}, {"$set": {"dedup_keys": duplicate_keys(resume)}}))
+        if len(updates) >= 1000:
+            updated += resumes_collection.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        updated += resumes_collection.bulk_write(updates, ordered=False).modified_count
+    return updated
+
+# MongoClient connects lazily, so the indexes and the backfill wait for the first duplicate
+# lookup instead of stalling import when the server is unreachable
+resume_collection_ready = False
+resume_collection_setup_lock = threading.Lock()
+
+def ensure_resume_collection():
+    """Run index setup and the dedup_keys backfill once per process; a failure is retried next time"""
+    global resume_collection_ready
+    if resume_collection_ready:
+        return
+    with resume_collection_setup_lock:
+        if resume_collection_ready:
+            return
+        create_resume_indexes()
+        updated = backfill_dedup_keys()
+        if updated:
+            print(f"Backfilled dedup_keys on {updated} resume record(s)")
+        resume_collection_ready = True
+
+# One duplicates_info entry, describing a removed record; stored is False, and the id None,
+# for a resume that was superseded within its upload batch before it was ever stored
+def duplicate_info(existing_resume, resume_id, match_reason, stored=True):
+    return {
+        "id": resume_id,
+        "filename": existing_resume.get("filename", "Unknown"),
+        "name": existing_resume.get("Full Name", "").strip(),
+        "email": existing_resume.get("Email Address", "").strip(),
+        "phone": existing_resume.get("Contact Number", "").strip(),
+        "match_reason": match_reason,
+        "stored": stored
+    }
+
 # Function to find and delete all duplicates
 def find_and_delete_duplicates(resume_data):
     raw_name = resume_data.get("Full Name", "").strip()
     raw_email = resume_data.get("Email Address", "").strip()
     raw_phone = resume_data.get("Contact Number", "").strip()
     
-    normalized_name = normalize_text(raw_name)
-    normalized_email = normalize_email(raw_email)
-    normalized_phone = normalize_phone(raw_phone)
+    keys = duplicate_keys(resume_data)
+    normalized_name = keys["name"]
+    normalized_email = keys["email"]
+    normalized_phone = keys["phone"]
     
     print(f"\n=== DUPLICATE DETECTION (ANY FIELD MATCH) ===")
     print(f"Looking for duplicates of:")
@@ -337,51 +1688,26 @@ def find_and_delete_duplicates(resume_data):
     
     deleted_count = 0
     duplicates_info = []
+    deleted_cv_filenames = set()
     
     try:
         if mongodb_available:
-            all_resumes = list(resumes_collection.find())
-            print(f"Found {len(all_resumes)} total resumes in database")
+            # One indexed lookup on the stored keys
+            ensure_resume_collection()
+            query = {"$or": [{f"dedup_keys.{field}": value} for field, value in keys.items() if value]}
+            matching_resumes = list(resumes_collection.find(query, DUPLICATE_PROJECTION).sort("_id", 1))
+            print(f"Found {len(matching_resumes)} matching resumes in database")
             
             duplicates_to_delete = []
             
-            for existing_resume in all_resumes:
-                existing_raw_name = existing_resume.get("Full Name", "").strip()
-                existing_raw_email = existing_resume.get("Email Address", "").strip()
-                existing_raw_phone = existing_resume.get("Contact Number", "").strip()
-                
-                existing_normalized_name = normalize_text(existing_raw_name)
-                existing_normalized_email = normalize_email(existing_raw_email)
-                existing_normalized_phone = normalize_phone(existing_raw_phone)
+            for existing_resume in matching_resumes:
+                match_reason = duplicate_match_reason(keys, existing_resume.get("dedup_keys", {}))
                 
-                name_match = normalized_name and existing_normalized_name and normalized_name == existing_normalized_name
-                email_match = normalized_email and existing_normalized_email and normalized_email == existing_normalized_email
-                phone_match = normalized_phone and existing_normalized_phone and normalized_phone == existing_normalized_phone
-                
-                is_duplicate = False
-                match_reason = ""
-                
-                if name_match:
-                    is_duplicate = True
-                    match_reason = "name"
-                elif email_match:
-                    is_duplicate = True
-                    match_reason = "email"
-                elif phone_match:
-                    is_duplicate = True
-                    match_reason = "phone"
-                
-                if is_duplicate:
+                if match_reason:
                     duplicates_to_delete.append(existing_resume["_id"])
-                    duplicates_info.append({
-                        "id": str(existing_resume.get("_id")),
-                        "filename": existing_resume.get("filename", "Unknown"),
-                        "name": existing_raw_name,
-                        "email": existing_raw_email,
-                        "phone": existing_raw_phone,
-                        "match_reason": match_reason
-                    })
-                    print(f"  DUPLICATE FOUND: {existing_raw_name} (matched on: {match_reason})")
+                    deleted_cv_filenames.add(existing_resume.get("cv_filename"))
+                    duplicates_info.append(duplicate_info(existing_resume, str(existing_resume.get("_id")), match_reason))
+                    print(f"  DUPLICATE FOUND: {duplicates_info[-1]['name']} (matched on: {match_reason})")
             
             if duplicates_to_delete:
                 result = resumes_collection.delete_many({"_id": {"$in": duplicates_to_delete}})
@@ -394,54 +1720,30 @@ def find_and_delete_duplicates(resume_data):
                 print("No duplicates found")
         
         else:
-            # Handle in-memory storage
+            # Handle in-memory storage through its hash indexes
             to_remove = []
-            for i, existing_resume in enumerate(resumes_data):
-                existing_raw_name = existing_resume.get("Full Name", "").strip()
-                existing_raw_email = existing_resume.get("Email Address", "").strip()
-                existing_raw_phone = existing_resume.get("Contact Number", "").strip()
-                
-                existing_normalized_name = normalize_text(existing_raw_name)
-                existing_normalized_email = normalize_email(existing_raw_email)
-                existing_normalized_phone = normalize_phone(existing_raw_phone)
-                
-                name_match = normalized_name and existing_normalized_name and normalized_name == existing_normalized_name
-                email_match = normalized_email and existing_normalized_email and normalized_email == existing_normalized_email
-                phone_match = normalized_phone and existing_normalized_phone and normalized_phone == existing_normalized_phone
-                
-                is_duplicate = False
-                match_reason = ""
-                
-                if name_match:
-                    is_duplicate = True
-                    match_reason = "name"
-                elif email_match:
-                    is_duplicate = True
-                    match_reason = "email"
-                elif phone_match:
-                    is_duplicate = True
-                    match_reason = "phone"
+            for existing_resume in resumes_data.find_duplicates(keys):
+                match_reason = duplicate_match_reason(keys, existing_resume["dedup_keys"])
                 
-                if is_duplicate:
-                    duplicates_info.append({
-                        "id": existing_resume.get("_id", "Unknown"),
-                        "filename": existing_resume.get("filename", "Unknown"),
-                        "name": existing_raw_name,
-                        "email": existing_raw_email,
-                        "phone": existing_raw_phone,
-                        "match_reason": match_reason
-                    })
-                    to_remove.append(i)
-                    print(f"  DUPLICATE FOUND: {existing_raw_name} (matched on: {match_reason})")
+                if match_reason:
+                    duplicates_info.append(duplicate_info(existing_resume, existing_resume.get("_id", "Unknown"), match_reason))
+                    to_remove.append(existing_resume["_id"])
+                    deleted_cv_filenames.add(existing_resume.get("cv_filename"))
+                    print(f"  DUPLICATE FOUND: {duplicates_info[-1]['name']} (matched on: {match_reason})")
             
-            for i in reversed(to_remove):
-                resumes_data.pop(i)
-                deleted_count += 1
+            for resume_id in to_remove:
+                if resumes_data.remove(resume_id) is not None:
+                    deleted_count += 1
             
             print(f"Successfully deleted {deleted_count} duplicate records from in-memory storage")
             
             for dup in duplicates_info:
                 print(f"  - Deleted: {dup['name']} ({dup['email']}, {dup['phone']}) - Matched on: {dup['match_reason']}")
+        
+        # The incoming resume is about to reference its own CV file, so never release that one
+        deleted_cv_filenames.discard(resume_data.get("cv_filename"))
+        for cv_filename in deleted_cv_filenames:
+            release_cv_file(cv_filename)
 
     except Exception as e:
         print(f"Error finding and deleting duplicates: {e}")
@@ -451,79 +1753,285 @@ def find_and_delete_duplicates(resume_data):
     print(f"=== DUPLICATE DETECTION COMPLETE ===\n")
     return deleted_count, duplicates_info
 
+# Resolve duplicates for a whole batch of parsed resumes before any of them is stored
+def find_and_delete_batch_duplicates(batch):
+    """Same outcome as running find_and_delete_duplicates and storing each resume in turn, with
+    one storage lookup and one delete for the batch. Returns one (deleted_count, duplicates_info)
+    per resume and the resumes left to store; the others are superseded by a later resume in
+    the batch, are never stored and are reported with an _id of None. Save CV files for the returned resumes only,
+    after this returns: a superseded resume's file would be left with no record."""
+    batch_keys = [duplicate_keys(resume_data) for resume_data in batch]
+    
+    # Stored records matching any resume in the batch, oldest first
+    stored = []
+    try:
+        if mongodb_available:
+            ensure_resume_collection()
+            values = {}
+            for keys in batch_keys:
+                for field, value in keys.items():
+                    if value:
+                        values.setdefault(field, set()).add(value)
+            if values:
+                query = {"$or": [{f"dedup_keys.{field}": {"$in": sorted(field_values)}} for field, field_values in values.items()]}
+                stored = [(record, str(record["_id"]), record.get("dedup_keys", {}))
+                          for record in resumes_collection.find(query, DUPLICATE_PROJECTION).sort("_id", 1)]
+        else:
+            stored = [(record, record["_id"], record["dedup_keys"]) for record in resumes_data.find_duplicates(*batch_keys)]
+    except Exception as e:
+        print(f"Error looking up duplicates for the batch: {e}")
+        import traceback
+        traceback.print_exc()
+    print(f"Found {len(stored)} stored resumes matching the batch")
+    
+    # Replay the batch in order: each resume removes whatever still stands that it matches,
+    # stored records before earlier resumes of the batch, as sequential inserts would have
+    outcomes = []
+    deleted_records = []
+    standing = []
+    for resume_data, keys in zip(batch, batch_keys):
+        duplicates_info = []
+        if any(keys.values()):
+            remaining = []
+            for record, resume_id, existing_keys in stored:
+                match_reason = duplicate_match_reason(keys, existing_keys)
+                if match_reason:
+                    duplicates_info.append(duplicate_info(record, resume_id, match_reason))
+                    deleted_records.append(record)
+                else:
+                    remaining.append((record, resume_id, existing_keys))
+            stored = remaining
+            
+            remaining = []
+            for earlier_resume, earlier_keys in standing:
+                match_reason = duplicate_match_reason(keys, earlier_keys)
+                if match_reason:
+                    earlier_resume['_id'] = None
+                    duplicates_info.append(duplicate_info(earlier_resume, None, match_reason, stored=False))
+                else:
+                    remaining.append((earlier_resume, earlier_keys))
+            standing = remaining
+        standing.append((resume_data, keys))
+        outcomes.append((len(duplicates_info), duplicates_info))
+    
+    try:
+        if deleted_records:
+            if mongodb_available:
+                result = resumes_collection.delete_many({"_id": {"$in": [record["_id"] for record in deleted_records]}})
+                print(f"Successfully deleted {result.deleted_count} duplicate records from MongoDB")
+            else:
+                for record in deleted_records:
+                    resumes_data.remove(record["_id"])
+                print(f"Successfully deleted {len(deleted_records)} duplicate records from in-memory storage")
+        
+        # A resume being stored may share its content-addressed CV file with a deleted record
+        survivors = [resume_data for resume_data, keys in standing]
+        deleted_cv_filenames = set(record.get("cv_filename") for record in deleted_records)
+        deleted_cv_filenames.difference_update(resume_data.get("cv_filename") for resume_data in survivors)
+        for cv_filename in deleted_cv_filenames:
+            release_cv_file(cv_filename)
+    except Exception as e:
+        print(f"Error deleting duplicates for the batch: {e}")
+        import traceback
+        traceback.print_exc()
+    
+    return outcomes, [resume_data for resume_data, keys in standing]
+
+# Function to find which section a stripped line starts, if any
+def match_section_header(line):
+    """The earliest section in SECTION_PATTERNS with a pattern found anywhere in the line"""
+    if len(line) >= 50:
+        return None
+    best = None
+    for match in PATTERN_REGISTRY['section_header'].finditer(line):
+        section = match.lastgroup
+        if best is None or SECTION_PRIORITY[section] < SECTION_PRIORITY[best]:
+            best = section
+            if SECTION_PRIORITY[best] == 0:
+                break
+    return best
+
+# A resume's text split once and shared by every extractor
+class ParsedDocument:
+    def __init__(self, text):
+        self.text = text
+        self.lines = text.split('\n')
+        self.first_line = self.lines[0].strip()
+        self._joined = {}
+    
+    @cached_property
+    def lower(self):
+        """Case-folded text with the same character offsets as text"""
+        return fold_case(self.text)
+    
+    @cached_property
+    def content_lines(self):
+        """(line number, stripped line) for every non-blank line"""
+        return [(number, stripped) for number, stripped in enumerate(line.strip() for line in self.lines) if stripped]
+    
+    @cached_property
+    def section_spans(self):
+        """Section name -> (start, end) slice of content_lines, header line included. Everything
+        before the first header is 'header', and a repeated header replaces the earlier span."""
+        spans = {}
+        current_section, start = 'header', 0
+        for index, (number, line) in enumerate(self.content_lines):
+            section = match_section_header(line)
+            if section:
+                spans[current_section] = (start, index)
+                current_section, start = section, index
+        spans[current_section] = (start, len(self.content_lines))
+        return spans
+    
+    def section_lines(self, section):
+        """Stripped lines of a section, or None when the resume has no such section"""
+        span = self.section_spans.get(section)
+        if span is None:
+            return None
+        return [line for number, line in self.content_lines[span[0]:span[1]]]
+    
+    def section_text(self, section, separator=' '):
+        key = (section, separator)
+        if key not in self._joined:
+            lines = self.section_lines(section)
+            self._joined[key] = separator.join(lines) if lines else ''
+        return self._joined[key]
+    
+    def head(self, line_count=20):
+        key = ('head', line_count)
+        if key not in self._joined:
+            self._joined[key] = '\n'.join(self.lines[:line_count])
+        return self._joined[key]
+
+def as_document(text):
+    return text if isinstance(text, ParsedDocument) else ParsedDocument(text)
+
 # Function to identify sections in the resume
 def identify_sections(text):
-    sections = {}
-    lines = text.split('\n')
-    current_section = 'header'
-    sections[current_section] = []
+    document = as_document(text)
+    return {section: document.section_lines(section) for section in document.section_spans}
+
+# Lines that are page furniture rather than resume content
+PAGE_NUMBER_PATTERN = re.compile(r'^(?:page\s*)?\d+(?:\s*(?:of|/)\s*\d+)?$', re.IGNORECASE)
+PAGE_FURNITURE_MAX_WORDS = 8
+
+# Running headers and footers: short lines repeated on every page
+def find_page_furniture(lines):
+    """Lowercased lines that repeat AI_FURNITURE_MIN_REPEATS times, or twice with a copy next to a
+    page number. Repeated job titles or duties appear only a couple of times, away from page numbers."""
+    counts = Counter(line.lower() for line in lines if len(line.split()) <= PAGE_FURNITURE_MAX_WORDS)
+    page_number_neighbours = set()
+    for index, line in enumerate(lines):
+        if PAGE_NUMBER_PATTERN.match(line):
+            page_number_neighbours.update(neighbour.lower() for neighbour in lines[max(0, index - 1):index + 2])
+    return {line for line, count in counts.items()
+            if count >= app.config['AI_FURNITURE_MIN_REPEATS'] or (count >= 2 and line in page_number_neighbours)}
+
+# Shrink resume text before it is sent to Gemini, recording everything that was removed
+def prepare_resume_text_for_ai(text):
+    """Return (prepared_text, report). Low-value sections are dropped, whitespace is
+    collapsed, page numbers and all but the first copy of a running header or footer are
+    removed, and the result is cut to
+    AI_TOKEN_BUDGET, trimming AI_TRIM_ORDER sections from the end before anything else."""
+    document = as_document(text)
+    chars_per_token = app.config['AI_CHARS_PER_TOKEN']
+    drop_sections = app.config['AI_DROP_SECTIONS']
+    
+    report = {
+        'original_tokens': len(document.text) // chars_per_token,
+        'dropped_sections': {},
+        'repeated_lines_removed': 0,
+        'page_number_lines_removed': 0,
+        'trimmed_sections': {},
+        'truncated': False
+    }
+    
+    lines = [line for line in (re.sub(r'\s+', ' ', line).strip() for line in document.lines) if line]
+    furniture = find_page_furniture(lines)
     
+    kept = []  # (section, line) pairs in reading order
+    seen_furniture = set()
+    current_section = 'header'
     for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+        section = match_section_header(line)
+        # Only short, heading-like lines start a section that is dropped, so a passing
+        # mention of "activities" inside a job description does not swallow what follows
+        if section and (section not in drop_sections or len(line.split()) <= 4):
+            current_section = section
         
-        section_found = False
-        for section, patterns in SECTION_PATTERNS.items():
-            for pattern in patterns:
-                if re.search(pattern, line, re.IGNORECASE) and len(line) < 50:
-                    current_section = section
-                    sections[current_section] = []
-                    section_found = True
-                    break
-            if section_found:
+        if current_section in drop_sections:
+            report['dropped_sections'][current_section] = report['dropped_sections'].get(current_section, 0) + 1
+            continue
+        if PAGE_NUMBER_PATTERN.match(line):
+            report['page_number_lines_removed'] += 1
+            continue
+        if line.lower() in furniture:
+            if line.lower() in seen_furniture:
+                report['repeated_lines_removed'] += 1
+                continue
+            seen_furniture.add(line.lower())
+        kept.append((current_section, line))
+    
+    budget_chars = app.config['AI_TOKEN_BUDGET'] * chars_per_token
+    total_chars = sum(len(line) + 1 for section, line in kept)
+    for trim_section in app.config['AI_TRIM_ORDER']:
+        if total_chars <= budget_chars:
+            break
+        for index in range(len(kept) - 1, -1, -1):
+            if total_chars <= budget_chars:
                 break
-        
-        sections[current_section].append(line)
-    
-    return sections
+            section, line = kept[index]
+            if section == trim_section:
+                total_chars -= len(line) + 1
+                kept[index] = None
+                report['trimmed_sections'][section] = report['trimmed_sections'].get(section, 0) + 1
+        kept = [entry for entry in kept if entry is not None]
+    
+    prepared_text = '\n'.join(line for section, line in kept)
+    if len(prepared_text) > budget_chars:
+        prepared_text = prepared_text[:budget_chars]
+        report['truncated'] = True
+    
+    report['final_tokens'] = len(prepared_text) // chars_per_token
+    return prepared_text, report
+
+# Helper function to check whether preparing the text removed anything
+def ai_input_was_trimmed(report):
+    return bool(report['dropped_sections'] or report['repeated_lines_removed'] or report['page_number_lines_removed']
+                or report['trimmed_sections'] or report['truncated'])
 
 # Function to extract education details
-def extract_education(education_section):
+def extract_education(document):
     education = []
+    education_section = document.section_lines('education')
     if not education_section:
         return education
     
-    text = ' '.join(education_section)
-    
-    degree_patterns = [
-        r'(?:bachelor|master|phd|b\.?s\.?|m\.?s\.?|b\.?e\.?|b\.?tech|m\.?tech)[^,\n]*',
-        r'(?:degree)[^,\n]*'
-    ]
-    
-    institution_patterns = [
-        r'(?:university|college|institute|school)[^,\n]*'
-    ]
+    text = document.section_text('education')
     
-    year_patterns = [
-        r'(?:20\d{2})\s*-\s*(?:20\d{2}|present|ongoing)',
-        r'(?:19\d{2})\s*-\s*(?:20\d{2}|present|ongoing)',
-        r'(?:20\d{2})',
-        r'(?:19\d{2})'
-    ]
-    
-    field_patterns = [
-        r'(?:in|of)\s+([A-Za-z\s&]+)'
-    ]
+    degree_patterns = PATTERN_REGISTRY['education_degree']
+    institution_patterns = PATTERN_REGISTRY['education_institution']
+    year_patterns = PATTERN_REGISTRY['education_year']
+    field_patterns = PATTERN_REGISTRY['education_field']
     
     degrees = []
     for pattern in degree_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+        matches = pattern.findall(text)
         degrees.extend(matches)
     
     institutions = []
     for pattern in institution_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+        matches = pattern.findall(text)
         institutions.extend(matches)
     
     years = []
     for pattern in year_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+        matches = pattern.findall(text)
         years.extend(matches)
     
     fields = []
     for pattern in field_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+        matches = pattern.findall(text)
         fields.extend(matches)
     
     if degrees or institutions:
@@ -549,32 +2057,32 @@ def extract_education(education_section):
     if not education and education_section:
         for line in education_section:
             if len(line.strip()) > 10:
-                if re.search(r'degree|bachelor|master|phd|university|college|institute|school', line, re.IGNORECASE):
+                if PATTERN_REGISTRY['education_keyword'].search(line):
                     degree = ""
                     institution = ""
                     years = ""
                     field = ""
                     
                     for pattern in degree_patterns:
-                        degree_match = re.search(pattern, line, re.IGNORECASE)
+                        degree_match = pattern.search(line)
                         if degree_match:
                             degree = degree_match.group(0).strip()
                             break
                     
                     for pattern in institution_patterns:
-                        institution_match = re.search(pattern, line, re.IGNORECASE)
+                        institution_match = pattern.search(line)
                         if institution_match:
                             institution = institution_match.group(0).strip()
                             break
                     
                     for pattern in year_patterns:
-                        years_match = re.search(pattern, line, re.IGNORECASE)
+                        years_match = pattern.search(line)
                         if years_match:
                             years = years_match.group(0).strip()
                             break
                     
                     for pattern in field_patterns:
-                        field_match = re.search(pattern, line, re.IGNORECASE)
+                        field_match = pattern.search(line)
                         if field_match:
                             field = field_match.group(1).strip()
                             break
@@ -591,21 +2099,19 @@ def extract_education(education_section):
     return education
 
 # Function to extract work experience
-def extract_experience(experience_section):
+def extract_experience(document):
     experience = []
+    experience_section = document.section_lines('experience')
     if not experience_section:
         return experience
     
-    full_text = ' '.join(experience_section)
+    full_text = document.section_text('experience')
     
     job_entries = []
     current_entry = []
     
     for line in experience_section:
-        if (re.search(r'(?:20\d{2}|19\d{2})\s*-\s*(?:20\d{2}|19\d{2}|present|ongoing)', line, re.IGNORECASE) or
-            re.search(r'^[A-Z][a-zA-Z\s&]+,', line) or
-            re.search(r'^[A-Z][a-zA-Z\s&]+\s+\|', line) or
-            re.search(r'^(?:senior|junior|lead|principal|software|web|mobile|data|cloud|devops|full\s+stack|front\s*end|back\s*end)\s+', line, re.IGNORECASE)):
+        if any(pattern.search(line) for pattern in PATTERN_REGISTRY['experience_entry_start']):
             
             if current_entry:
                 job_entries.append('\n'.join(current_entry))
@@ -629,43 +2135,24 @@ def extract_experience(experience_section):
         years = ""
         description = entry.strip()
         
-        company_patterns = [
-            r'(?:at|with|for)?\s*([A-Za-z0-9\s&.,]+?)(?:\n|\s{2,}|$)',
-            r'(?:company|employer)[:\s]+([A-Za-z0-9\s&.,]+)',
-            r'^([A-Z][a-zA-Z\s&]+),',
-            r'^([A-Z][a-zA-Z\s&]+)\s+\|'
-        ]
-        
-        for pattern in company_patterns:
-            company_match = re.search(pattern, entry, re.IGNORECASE)
+        for pattern in PATTERN_REGISTRY['experience_company']:
+            company_match = pattern.search(entry)
             if company_match:
                 company = company_match.group(1).strip()
                 break
         
-        role_patterns = [
-            r'(?:as|position|role|title)[:\s]+([A-Za-z\s]+)',
-            r'(?:senior|junior|lead|principal|software|web|mobile|data|cloud|devops|full\s+stack|front\s*end|back\s*end)\s+([A-Za-z\s]+)',
-            r'([A-Za-z\s]+?)\s+(?:developer|engineer|analyst|manager|consultant|designer|architect)'
-        ]
-        
-        for pattern in role_patterns:
-            role_match = re.search(pattern, entry, re.IGNORECASE)
+        for pattern in PATTERN_REGISTRY['experience_role']:
+            role_match = pattern.search(entry)
             if role_match:
                 role = role_match.group(1).strip()
-                if not re.search(r'developer|engineer|analyst|manager|consultant|designer|architect', role, re.IGNORECASE):
-                    suffix_match = re.search(r'(developer|engineer|analyst|manager|consultant|designer|architect)', entry, re.IGNORECASE)
+                if not PATTERN_REGISTRY['role_keyword'].search(role):
+                    suffix_match = PATTERN_REGISTRY['role_suffix'].search(entry)
                     if suffix_match:
                         role += " " + suffix_match.group(1)
                 break
         
-        year_patterns = [
-            r'(?:20\d{2}|19\d{2})\s*-\s*(?:20\d{2}|19\d{2}|present|ongoing)',
-            r'(?:from|since)\s+(?:20\d{2}|19\d{2})',
-            r'(?:20\d{2}|19\d{2})'
-        ]
-        
-        for pattern in year_patterns:
-            years_match = re.search(pattern, entry, re.IGNORECASE)
+        for pattern in PATTERN_REGISTRY['experience_year']:
+            years_match = pattern.search(entry)
             if years_match:
                 years = years_match.group(0).strip()
                 break
@@ -682,40 +2169,20 @@ def extract_experience(experience_section):
     return experience
 
 # Function to extract skills
-def extract_skills(text, skills_section=None):
-    technical_skills = []
-    soft_skills = []
-    
-    if skills_section:
-        skills_text = ' '.join(skills_section)
+def extract_skills(document):
+    if document.section_lines('skills'):
+        skills_text = document.section_text('skills')
+        folded_text = fold_case(skills_text)
     else:
-        skills_text = text
-    
-    for skill in TECHNICAL_SKILLS:
-        if re.search(r'\b' + re.escape(skill) + r'\b', skills_text, re.IGNORECASE):
-            if skill not in technical_skills:
-                technical_skills.append(skill)
-    
-    for skill in SOFT_SKILLS:
-        if re.search(r'\b' + re.escape(skill) + r'\b', skills_text, re.IGNORECASE):
-            if skill not in soft_skills:
-                soft_skills.append(skill)
-    
-    if not technical_skills and not skills_section:
-        for skill in TECHNICAL_SKILLS:
-            if re.search(r'\b' + re.escape(skill) + r'\b', text, re.IGNORECASE):
-                if skill not in technical_skills:
-                    technical_skills.append(skill)
-    
-    if not soft_skills and not skills_section:
-        for skill in SOFT_SKILLS:
-            if re.search(r'\b' + re.escape(skill) + r'\b', text, re.IGNORECASE):
-                if skill not in soft_skills:
-                    soft_skills.append(skill)
+        skills_text = document.text
+        folded_text = document.lower
+    
+    # Every skill and alias in the taxonomy is matched in a single pass over the text
+    skills = SKILL_TAXONOMY.categorize(SKILL_TAXONOMY.find_skill_ids(skills_text, folded_text))
     
     return {
-        "Technical": technical_skills,
-        "Soft": soft_skills
+        "Technical": skills["Technical"],
+        "Soft": skills["Soft"]
     }
 
 # Function to validate and format LinkedIn URL - IMPROVED
@@ -730,12 +2197,12 @@ def validate_linkedin_url(url_or_username):
         
         # If it contains linkedin.com
         if 'linkedin.com' in url_or_username:
-            match = re.search(r'linkedin\.com/in/([a-zA-Z0-9_-]+)', url_or_username)
+            match = PATTERN_REGISTRY['linkedin_username_in_url'].search(url_or_username)
             if match:
                 return f"https://www.linkedin.com/in/{match.group(1)}"
         
         # If it's just a username (3-100 chars, alphanumeric, dash, underscore)
-        if re.match(r'^[a-zA-Z0-9_-]{3,100}$', url_or_username):
+        if PATTERN_REGISTRY['linkedin_username'].match(url_or_username):
             return f"https://www.linkedin.com/in/{url_or_username}"
     
     return ""
@@ -750,11 +2217,11 @@ def validate_github_url(url_or_username):
                 return url_or_username
         
         if 'github.com' in url_or_username:
-            match = re.search(r'github\.com/([a-zA-Z0-9_-]+)', url_or_username)
+            match = PATTERN_REGISTRY['github_username_in_url'].search(url_or_username)
             if match:
                 return f"https://github.com/{match.group(1)}"
         
-        if re.match(r'^[a-zA-Z0-9_-]{1,39}$', url_or_username):
+        if PATTERN_REGISTRY['github_username'].match(url_or_username):
             return f"https://github.com/{url_or_username}"
     
     return ""
@@ -774,7 +2241,7 @@ def fetch_profile_data(linkedin_url, github_url):
     
     if github_url:
         try:
-            username = re.search(r'github\.com/([a-zA-Z0-9_-]+)', github_url)
+            username = PATTERN_REGISTRY['github_username_in_url'].search(github_url)
             if username:
                 username = username.group(1)
                 response = requests.get(f"https://api.github.com/users/{username}")
@@ -786,7 +2253,8 @@ def fetch_profile_data(linkedin_url, github_url):
     return profile_data
 
 # Function to extract personal information - IMPROVED LinkedIn extraction
-def extract_personal_info(text, personal_section=None):
+def extract_personal_info(document):
+    text = document.text
     personal_info = {
         "Full Name": "",
         "Email Address": "",
@@ -796,15 +2264,15 @@ def extract_personal_info(text, personal_section=None):
         "GitHub": ""
     }
     
+    personal_section = document.section_lines('personal_info')
     if personal_section:
-        personal_text = '\n'.join(personal_section)
+        personal_text = document.section_text('personal_info', '\n')
     else:
-        lines = text.split('\n')
-        personal_text = '\n'.join(lines[:20])
+        personal_text = document.head(20)
     
     # Extract name
-    first_line = text.split('\n')[0].strip()
-    if 5 <= len(first_line) <= 40 and not re.search(r'resume|cv|curriculum|vitae', first_line, re.IGNORECASE):
+    first_line = document.first_line
+    if 5 <= len(first_line) <= 40 and not PATTERN_REGISTRY['name_exclusion'].search(first_line):
         words = first_line.split()
         if 1 < len(words) <= 5:
             if all(word[0].isupper() for word in words if len(word) > 1):
@@ -814,137 +2282,123 @@ def extract_personal_info(text, personal_section=None):
                 personal_info["Full Name"] = name
     
     if not personal_info["Full Name"]:
-        for pattern in NAME_PATTERNS:
+        for pattern in PATTERN_REGISTRY['name']:
             try:
-                matches = re.findall(pattern, personal_text, re.MULTILINE)
-                if matches:
-                    name = matches[0].strip()
+                name = first_match_text(pattern, personal_text)
+                if name is not None:
+                    name = name.strip()
                     if name.startswith("Contact "):
                         name = name[8:].strip()
                     personal_info["Full Name"] = name
                     break
             except Exception as e:
-                print(f"Error with name pattern '{pattern}': {e}")
+                print(f"Error with name pattern '{pattern.pattern}': {e}")
                 continue
     
     if not personal_info["Full Name"] and personal_section:
-        for pattern in NAME_PATTERNS:
+        for pattern in PATTERN_REGISTRY['name']:
             try:
-                matches = re.findall(pattern, text, re.MULTILINE)
-                if matches:
-                    name = matches[0].strip()
+                name = first_match_text(pattern, text)
+                if name is not None:
+                    name = name.strip()
                     if name.startswith("Contact "):
                         name = name[8:].strip()
                     personal_info["Full Name"] = name
                     break
             except Exception as e:
-                print(f"Error with name pattern '{pattern}': {e}")
+                print(f"Error with name pattern '{pattern.pattern}': {e}")
                 continue
     
     # Extract email
-    for pattern in EMAIL_PATTERNS:
+    for pattern in PATTERN_REGISTRY['email']:
         try:
-            matches = re.findall(pattern, personal_text)
-            if matches:
-                if isinstance(matches[0], tuple):
-                    personal_info["Email Address"] = matches[0][0].strip()
-                else:
-                    personal_info["Email Address"] = matches[0].strip()
+            match_text = first_match_text(pattern, personal_text)
+            if match_text is not None:
+                personal_info["Email Address"] = match_text.strip()
                 break
         except Exception as e:
-            print(f"Error with email pattern '{pattern}': {e}")
+            print(f"Error with email pattern '{pattern.pattern}': {e}")
             continue
     
     if not personal_info["Email Address"]:
-        for pattern in EMAIL_PATTERNS:
+        for pattern in PATTERN_REGISTRY['email']:
             try:
-                matches = re.findall(pattern, text)
-                if matches:
-                    if isinstance(matches[0], tuple):
-                        personal_info["Email Address"] = matches[0][0].strip()
-                    else:
-                        personal_info["Email Address"] = matches[0].strip()
+                match_text = first_match_text(pattern, text)
+                if match_text is not None:
+                    personal_info["Email Address"] = match_text.strip()
                     break
             except Exception as e:
-                print(f"Error with email pattern '{pattern}': {e}")
+                print(f"Error with email pattern '{pattern.pattern}': {e}")
                 continue
     
     # Extract phone number
-    for pattern in PHONE_PATTERNS:
+    for pattern in PATTERN_REGISTRY['phone']:
         try:
-            matches = re.findall(pattern, personal_text)
-            if matches:
-                if isinstance(matches[0], tuple):
-                    personal_info["Contact Number"] = matches[0][0].strip()
-                else:
-                    personal_info["Contact Number"] = matches[0].strip()
+            match_text = first_match_text(pattern, personal_text)
+            if match_text is not None:
+                personal_info["Contact Number"] = match_text.strip()
                 break
         except Exception as e:
-            print(f"Error with phone pattern '{pattern}': {e}")
+            print(f"Error with phone pattern '{pattern.pattern}': {e}")
             continue
     
     if not personal_info["Contact Number"]:
-        for pattern in PHONE_PATTERNS:
+        for pattern in PATTERN_REGISTRY['phone']:
             try:
-                matches = re.findall(pattern, text)
-                if matches:
-                    if isinstance(matches[0], tuple):
-                        personal_info["Contact Number"] = matches[0][0].strip()
-                    else:
-                        personal_info["Contact Number"] = matches[0].strip()
+                match_text = first_match_text(pattern, text)
+                if match_text is not None:
+                    personal_info["Contact Number"] = match_text.strip()
                     break
             except Exception as e:
-                print(f"Error with phone pattern '{pattern}': {e}")
+                print(f"Error with phone pattern '{pattern.pattern}': {e}")
                 continue
     
     # Extract location
-    for pattern in LOCATION_PATTERNS:
+    for pattern in PATTERN_REGISTRY['location']:
         try:
-            matches = re.findall(pattern, personal_text, re.IGNORECASE)
-            if matches:
-                personal_info["Location"] = matches[0].strip()
+            location = first_match_text(pattern, personal_text)
+            if location is not None:
+                personal_info["Location"] = location.strip()
                 break
         except Exception as e:
-            print(f"Error with location pattern '{pattern}': {e}")
+            print(f"Error with location pattern '{pattern.pattern}': {e}")
             continue
     
     if not personal_info["Location"]:
-        for pattern in LOCATION_PATTERNS:
+        for pattern in PATTERN_REGISTRY['location']:
             try:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                if matches:
-                    personal_info["Location"] = matches[0].strip()
+                location = first_match_text(pattern, text)
+                if location is not None:
+                    personal_info["Location"] = location.strip()
                     break
             except Exception as e:
-                print(f"Error with location pattern '{pattern}': {e}")
+                print(f"Error with location pattern '{pattern.pattern}': {e}")
                 continue
     
     # Extract LinkedIn URL - IMPROVED
-    for pattern in LINKEDIN_PATTERNS:
+    for pattern in PATTERN_REGISTRY['linkedin']:
         try:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                url = matches[0]
+            url = first_match_text(pattern, text)
+            if url is not None:
                 validated_url = validate_linkedin_url(url)
                 if validated_url:
                     personal_info["LinkedIn"] = validated_url
                     break
         except Exception as e:
-            print(f"Error with LinkedIn pattern '{pattern}': {e}")
+            print(f"Error with LinkedIn pattern '{pattern.pattern}': {e}")
             continue
     
     # Extract GitHub URL
-    for pattern in GITHUB_PATTERNS:
+    for pattern in PATTERN_REGISTRY['github']:
         try:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                url = matches[0]
+            url = first_match_text(pattern, text)
+            if url is not None:
                 validated_url = validate_github_url(url)
                 if validated_url:
                     personal_info["GitHub"] = validated_url
                     break
         except Exception as e:
-            print(f"Error with GitHub pattern '{pattern}': {e}")
+            print(f"Error with GitHub pattern '{pattern.pattern}': {e}")
             continue
     
     # Fetch additional profile data
@@ -955,39 +2409,48 @@ def extract_personal_info(text, personal_section=None):
     
     return personal_info
 
+# Function to extract projects: short capitalised lines are titles, the rest descriptions
+def extract_projects(document):
+    projects = []
+    project_lines = document.section_lines('projects')
+    if not project_lines:
+        return projects
+    
+    current_project = {"Name": "", "Description": ""}
+    for line in project_lines:
+        if PATTERN_REGISTRY['project_title'].match(line) and len(line) < 50:
+            if current_project["Name"]:
+                projects.append(current_project)
+                current_project = {"Name": "", "Description": ""}
+            current_project["Name"] = line
+        else:
+            current_project["Description"] += line + " "
+    
+    if current_project["Name"]:
+        projects.append(current_project)
+    
+    return projects
+
 # Function to generate recommended roles based on skills
 def generate_recommended_roles(skills):
-    role_mapping = {
-        "Python": ["Python Developer", "Data Scientist", "Backend Developer"],
-        "JavaScript": ["Frontend Developer", "Full Stack Developer", "Web Developer"],
-        "React": ["React Developer", "Frontend Developer", "UI Developer"],
-        "Angular": ["Angular Developer", "Frontend Developer", "UI Developer"],
-        "Node.js": ["Node.js Developer", "Backend Developer", "Full Stack Developer"],
-        "SQL": ["Database Administrator", "Data Analyst", "Backend Developer"],
-        "MongoDB": ["MongoDB Developer", "NoSQL Developer", "Backend Developer"],
-        "AWS": ["Cloud Engineer", "DevOps Engineer", "Solutions Architect"],
-        "Docker": ["DevOps Engineer", "Cloud Engineer", "Systems Administrator"],
-        "Machine Learning": ["Machine Learning Engineer", "Data Scientist", "AI Researcher"],
-        "Full Stack": ["Full Stack Developer", "Web Developer", "Software Engineer"],
-        "Frontend": ["Frontend Developer", "UI Developer", "Web Designer"],
-        "Backend": ["Backend Developer", "API Developer", "Server Engineer"],
-        "Mobile": ["Mobile Developer", "iOS Developer", "Android Developer"],
-        "DevOps": ["DevOps Engineer", "SRE", "Cloud Engineer"],
-        "Data": ["Data Analyst", "Data Engineer", "Business Intelligence Analyst"],
-        "Solidity": ["Blockchain Developer", "Smart Contract Developer", "Ethereum Developer"],
-        "Ethereum": ["Blockchain Developer", "Smart Contract Developer", "DApp Developer"],
-        "Smart Contracts": ["Blockchain Developer", "Smart Contract Developer", "Solidity Developer"],
-        "Web3": ["Blockchain Developer", "DApp Developer", "Web3 Developer"]
-    }
-    
-    recommended_roles = set()
+    skill_ids = []
     for skill in skills.get("Technical", []):
-        for key, roles in role_mapping.items():
-            if key.lower() in skill.lower() or skill.lower() in key.lower():
-                for role in roles:
-                    recommended_roles.add(role)
-    
-    return list(recommended_roles)[:5]
+        if not isinstance(skill, str):
+            continue
+        skill_id = SKILL_TAXONOMY.skill_id(skill)
+        # Free-form names, e.g. from Gemini, may embed known skills ("Python (Django)")
+        found_ids = [skill_id] if skill_id is not None else SKILL_TAXONOMY.find_skill_ids(skill)
+        for found_id in found_ids:
+            if found_id not in skill_ids:
+                skill_ids.append(found_id)
+    
+    recommended_role_ids = []
+    for skill_id in skill_ids:
+        for role_id in SKILL_TAXONOMY.role_ids[skill_id]:
+            if role_id not in recommended_role_ids:
+                recommended_role_ids.append(role_id)
+    
+    return [SKILL_TAXONOMY.roles[role_id] for role_id in recommended_role_ids[:5]]
 
 # Function to score a resume based on a search skill
 def score_resume(resume, search_skill):
@@ -1010,8 +2473,11 @@ def score_resume(resume, search_skill):
         elif isinstance(resume['Skills'], str):
             all_skills = [resume['Skills']]
         
+        # Aliases count as exact matches, e.g. "JS" for "JavaScript"
+        search_skill_id = SKILL_TAXONOMY.skill_id(search_skill)
         for skill in all_skills:
-            if isinstance(skill, str) and search_skill_lower == skill.lower():
+            if isinstance(skill, str) and (search_skill_lower == skill.lower() or
+                                           (search_skill_id is not None and SKILL_TAXONOMY.skill_id(skill) == search_skill_id)):
                 score += 40
                 break
         
@@ -1113,10 +2579,18 @@ def score_resume(resume, search_skill):
     return score
 
 # Improved resume parsing function
-def parse_resume(text, filename=""):
-    if gemini_available:
+def parse_resume(text, filename="", content_hash=None, ai_resume_data=None):
+    """ai_resume_data lets batch callers pass a Gemini result obtained elsewhere"""
+    document = ParsedDocument(text)
+    if app.config['AI_PARSING_MODE'] == 'hybrid' and ai_resume_data is None:
+        return parse_resume_hybrid(document, filename, content_hash)
+    
+    # While the AI circuit breaker is open, go straight to the rule-based parser
+    if gemini_available and (ai_resume_data is not None or not ai_circuit_breaker.is_open()):
         try:
-            ai_resume_data = parse_resume_with_ai(text)
+            ai_text, ai_input_report = prepare_resume_text_for_ai(document)
+            if ai_resume_data is None:
+                ai_resume_data = parse_resume_with_ai(ai_text)
             
             if ai_resume_data and not "error" in ai_resume_data:
                 if "Full Name" in ai_resume_data and ai_resume_data["Full Name"]:
@@ -1126,9 +2600,11 @@ def parse_resume(text, filename=""):
                 
                 ai_resume_data["upload_date"] = datetime.now()
                 ai_resume_data["filename"] = filename
+                if ai_input_was_trimmed(ai_input_report):
+                    ai_resume_data["ai_input_report"] = ai_input_report
                 
                 # Generate CV URL
-                cv_url, cv_filename = generate_cv_url(filename)
+                cv_url, cv_filename = generate_cv_url(filename, content_hash)
                 ai_resume_data["cv_url"] = cv_url
                 ai_resume_data["cv_filename"] = cv_filename
                 
@@ -1146,27 +2622,7 @@ def parse_resume(text, filename=""):
                 if "Recommended Roles" not in ai_resume_data:
                     ai_resume_data["Recommended Roles"] = generate_recommended_roles(ai_resume_data["Skills"])
                 
-                sections = identify_sections(text)
-                if 'projects' in sections:
-                    projects = []
-                    project_lines = sections['projects']
-                    current_project = {"Name": "", "Description": ""}
-                    
-                    for line in project_lines:
-                        if re.match(r'^[A-Z]', line) and len(line) < 50:
-                            if current_project["Name"]:
-                                projects.append(current_project)
-                                current_project = {"Name": "", "Description": ""}
-                            current_project["Name"] = line
-                        else:
-                            current_project["Description"] += line + " "
-                    
-                    if current_project["Name"]:
-                        projects.append(current_project)
-                    
-                    ai_resume_data["Projects"] = projects
-                else:
-                    ai_resume_data["Projects"] = []
+                ai_resume_data["Projects"] = extract_projects(document)
                 
                 if "LinkedIn" in ai_resume_data and ai_resume_data["LinkedIn"]:
                     ai_resume_data["LinkedIn"] = validate_linkedin_url(ai_resume_data["LinkedIn"])
@@ -1187,7 +2643,10 @@ def parse_resume(text, filename=""):
         except Exception as e:
             print(f"Error parsing resume with AI: {e}")
     
-    # Rule-based parsing fallback
+    return parse_resume_rule_based(document, filename, content_hash)
+
+# Rule-based parsing, used as the AI fallback and as the first pass of hybrid parsing
+def parse_resume_rule_based(text, filename="", content_hash=None):
     resume_data = {
         "Full Name": "",
         "Email Address": "",
@@ -1210,42 +2669,137 @@ def parse_resume(text, filename=""):
     }
     
     # Generate CV URL
-    cv_url, cv_filename = generate_cv_url(filename)
+    cv_url, cv_filename = generate_cv_url(filename, content_hash)
     resume_data["cv_url"] = cv_url
     resume_data["cv_filename"] = cv_filename
     
-    sections = identify_sections(text)
-    
-    personal_info = extract_personal_info(text, sections.get('personal_info', None))
-    resume_data.update(personal_info)
-    
-    resume_data["Education"] = extract_education(sections.get('education', None))
-    resume_data["Work Experience"] = extract_experience(sections.get('experience', None))
-    resume_data["Skills"] = extract_skills(text, sections.get('skills', None))
+    document = as_document(text)
     
-    if 'projects' in sections:
-        projects = []
-        project_lines = sections['projects']
-        current_project = {"Name": "", "Description": ""}
+    # Once the budget is spent the remaining patterns find nothing, so a hostile file yields a
+    # partial result instead of holding a worker
+    with regex_budget(app.config['PARSER_CPU_BUDGET']) as budget:
+        personal_info = extract_personal_info(document)
+        resume_data.update(personal_info)
         
-        for line in project_lines:
-            if re.match(r'^[A-Z]', line) and len(line) < 50:
-                if current_project["Name"]:
-                    projects.append(current_project)
-                    current_project = {"Name": "", "Description": ""}
-                current_project["Name"] = line
-            else:
-                current_project["Description"] += line + " "
-        
-        if current_project["Name"]:
-            projects.append(current_project)
-        
-        resume_data["Projects"] = projects
+        resume_data["Education"] = extract_education(document)
+        resume_data["Work Experience"] = extract_experience(document)
+        resume_data["Skills"] = extract_skills(document)
+        resume_data["Projects"] = extract_projects(document)
+    if budget.exhausted:
+        resume_data["parse_budget_exhausted"] = True
     
     resume_data["Recommended Roles"] = generate_recommended_roles(resume_data["Skills"])
     
     return resume_data
 
+# Fields that hybrid parsing scores and can ask Gemini for on their own
+CONFIDENCE_FIELDS = ("Full Name", "Email Address", "Contact Number", "Skills", "Education", "Work Experience")
+
+# Score how much each rule-based field can be trusted, from 0.0 (missing) to 1.0
+def score_rule_based_fields(resume_data):
+    scores = {}
+    
+    name = resume_data.get("Full Name", "")
+    words = name.split()
+    if 2 <= len(words) <= 4 and all(word[0].isupper() for word in words) and not re.search(r'[\d@:/]', name):
+        scores["Full Name"] = 1.0
+    else:
+        scores["Full Name"] = 0.3 if name else 0.0
+    
+    email = resume_data.get("Email Address", "")
+    scores["Email Address"] = 1.0 if re.fullmatch(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}', email) else 0.0
+    
+    digits = re.sub(r'\D', '', resume_data.get("Contact Number", ""))
+    if 10 <= len(digits) <= 15:
+        scores["Contact Number"] = 1.0
+    else:
+        scores["Contact Number"] = 0.5 if len(digits) >= 7 else 0.0
+    
+    technical_skills = resume_data.get("Skills", {}).get("Technical", [])
+    if len(technical_skills) >= 3:
+        scores["Skills"] = 1.0
+    else:
+        scores["Skills"] = 0.5 if technical_skills else 0.0
+    
+    education = resume_data.get("Education", [])
+    if any(entry.get("Degree") and entry.get("Institution") for entry in education):
+        scores["Education"] = 1.0
+    else:
+        scores["Education"] = 0.5 if education else 0.0
+    
+    experience = resume_data.get("Work Experience", [])
+    if any(entry.get("Company") and entry.get("Role") for entry in experience):
+        scores["Work Experience"] = 1.0
+    else:
+        scores["Work Experience"] = 0.5 if experience else 0.0
+    
+    return scores
+
+# Overlay field-level AI output onto a rule-based result; returns the fields that were replaced
+def merge_ai_fields(resume_data, ai_fields_data, fields):
+    merged = []
+    for field in fields:
+        value = ai_fields_data.get(field)
+        if field == "Skills":
+            if isinstance(value, list):
+                value = {"Technical": value, "Soft": []}
+            if not isinstance(value, dict):
+                continue
+            # Keep the dictionary matches and add whatever Gemini found on top
+            skills = {"Technical": list(resume_data["Skills"]["Technical"]), "Soft": list(resume_data["Skills"]["Soft"])}
+            for category in ("Technical", "Soft"):
+                for skill in value.get(category) or []:
+                    if isinstance(skill, str) and skill.strip() and skill.strip() not in skills[category]:
+                        skills[category].append(skill.strip())
+            if skills == resume_data["Skills"]:
+                continue
+            value = skills
+        elif field in ("Education", "Work Experience"):
+            if not isinstance(value, list):
+                continue
+            value = [entry for entry in value if isinstance(entry, dict)]
+            if not value:
+                continue
+        else:
+            if not isinstance(value, str) or not value.strip():
+                continue
+            value = value.strip()
+            if field == "Full Name" and value.startswith("Contact "):
+                value = value[8:].strip()
+        resume_data[field] = value
+        merged.append(field)
+    return merged
+
+# Hybrid parsing: rule-based first, then Gemini only for the fields the rules could not pin down
+def parse_resume_hybrid(text, filename="", content_hash=None):
+    document = as_document(text)
+    resume_data = parse_resume_rule_based(document, filename, content_hash)
+    confidence = score_rule_based_fields(resume_data)
+    resume_data["field_confidence"] = confidence
+    
+    weak_fields = [field for field in CONFIDENCE_FIELDS if confidence[field] < app.config['AI_CONFIDENCE_THRESHOLD']]
+    if not weak_fields or not gemini_available or ai_circuit_breaker.is_open():
+        return resume_data
+    
+    try:
+        ai_text, ai_input_report = prepare_resume_text_for_ai(document)
+        ai_fields_data = parse_resume_fields_with_ai(ai_text, weak_fields)
+        if not isinstance(ai_fields_data, dict) or "error" in ai_fields_data:
+            print(f"Error parsing resume fields with AI: {ai_fields_data}")
+            return resume_data
+        
+        merged = merge_ai_fields(resume_data, ai_fields_data, weak_fields)
+        if merged:
+            resume_data["ai_fields"] = merged
+            if ai_input_was_trimmed(ai_input_report):
+                resume_data["ai_input_report"] = ai_input_report
+            if "Skills" in merged:
+                resume_data["Recommended Roles"] = generate_recommended_roles(resume_data["Skills"])
+    except Exception as e:
+        print(f"Error parsing resume fields with AI: {e}")
+    
+    return resume_data
+
 # Routes
 @app.route('/')
 def index():
@@ -1271,34 +2825,18 @@ def upload_resume():
     
     if file and allowed_file(file.filename):
         try:
-            filename = str(uuid.uuid4()) + '_' + secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            
-            file.save(file_path)
+            data = read_upload(file)
             
-            text = extract_text(file_path)
-            resume_data = parse_resume(text, file.filename)
+            text, truncation = extract_text_from_bytes(data, file.filename)
+            resume_data = parse_resume(text, file.filename, hashlib.sha256(data).hexdigest())
+            if truncation:
+                resume_data["extraction_truncated"] = truncation
             
             # Save CV file for URL access
-            cv_file_path = os.path.join(app.config['CV_FOLDER'], resume_data["cv_filename"])
-            import shutil
-            shutil.copy2(file_path, cv_file_path)
+            save_cv_file(data, resume_data["cv_filename"])
             
             deleted_count, duplicates_info = find_and_delete_duplicates(resume_data)
-            
-            try:
-                if mongodb_available:
-                    resume_id = resumes_collection.insert_one(resume_data).inserted_id
-                    resume_data['_id'] = str(resume_id)
-                else:
-                    resume_data['_id'] = str(uuid.uuid4())
-                    resumes_data.append(resume_data)
-            except Exception as e:
-                print(f"MongoDB error: {e}")
-                resume_data['_id'] = str(uuid.uuid4())
-                resumes_data.append(resume_data)
-            
-            os.remove(file_path)
+            store_resume(resume_data)
             
             return jsonify({
                 'success': True,
@@ -1313,6 +2851,228 @@ def upload_resume():
     else:
         return jsonify({'error': 'File type not allowed'})
 
+# Save a parsed resume, falling back to in-memory storage if MongoDB fails
+def store_resume(resume_data):
+    resume_data["dedup_keys"] = duplicate_keys(resume_data)
+    try:
+        if mongodb_available:
+            resume_id = resumes_collection.insert_one(resume_data).inserted_id
+            resume_data['_id'] = str(resume_id)
+            print(f"Saved to MongoDB with ID: {resume_id}")
+        else:
+            resume_data['_id'] = str(uuid.uuid4())
+            resumes_data.append(resume_data)
+            print(f"Saved to in-memory storage with ID: {resume_data['_id']}")
+    except Exception as e:
+        print(f"MongoDB error: {e}")
+        resume_data['_id'] = str(uuid.uuid4())
+        resumes_data.append(resume_data)
+        print(f"Fallback: Saved to in-memory storage with ID: {resume_data['_id']}")
+
+# Parse many resumes, yielding results in input order as soon as each is ready
+def parse_resumes(items, workers=None):
+    """items are resume texts or tuples of parse_resume's arguments, e.g. (text, filename,
+    content_hash), and are read lazily, a few per worker ahead of the results. Yields one
+    resume dict per item, or the exception raised while parsing it, with the same content
+    parse_resume would return (unless AI_BATCH_SIZE packs resumes into one Gemini request).
+    workers is the number of parsing threads; by default AI_MAX_IN_FLIGHT when Gemini is
+    available, since the threads mostly wait on it, and 1 otherwise."""
+    if workers is None:
+        workers = app.config['AI_MAX_IN_FLIGHT'] if gemini_available else 1
+    items = ((item,) if isinstance(item, str) else tuple(item) for item in items)
+    
+    def parse_item(item, ai_resume_data=None):
+        try:
+            if ai_resume_data is None:
+                return parse_resume(*item)
+            return parse_resume(*item[:3], ai_resume_data=ai_resume_data)
+        except Exception as e:
+            return e
+    
+    def parse_group(group):
+        if len(group) == 1:
+            return [parse_item(group[0])]
+        try:
+            ai_results = parse_resumes_with_ai_batch([prepare_resume_text_for_ai(item[0])[0] for item in group])
+        except Exception as e:
+            return [e] * len(group)
+        return [parse_item(item, ai_resume_data) for item, ai_resume_data in zip(group, ai_results)]
+    
+    # Decided once per call; hybrid mode sends narrow per-field prompts, so only full-resume parsing is batched
+    batch_size = app.config['AI_BATCH_SIZE']
+    if gemini_available and batch_size > 1 and app.config['AI_PARSING_MODE'] != 'hybrid' and not ai_circuit_breaker.is_open():
+        units = iter(lambda: list(islice(items, batch_size)), [])
+        parse_unit = parse_group
+    else:
+        units = ([item] for item in items)
+        parse_unit = lambda group: [parse_item(group[0])]
+    
+    if workers <= 1:
+        for unit in units:
+            yield from parse_unit(unit)
+        return
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for unit in units:
+            pending.append(executor.submit(parse_unit, unit))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# Extract, parse, de-duplicate and store a batch of uploaded files
+def process_resume_batch(uploads, results):
+    """Process (filename, data) pairs in order, where data is None for a rejected file.
+    Outcomes are accumulated into results, as created by new_batch_results()."""
+    documents = [(filename, data) for filename, data in uploads if data is not None]
+    extractions = extract_texts(documents)
+    
+    # Parsing runs ahead in worker threads while earlier results are collected
+    parsed = parse_resumes(
+        (extraction[0], filename, hashlib.sha256(data).hexdigest())
+        for (filename, data), extraction in zip(documents, extractions)
+        if extraction is not None
+    )
+    extractions = iter(extractions)
+    
+    batch = []
+    batch_data = []
+    for filename, data in uploads:
+        if data is not None:
+            extraction = next(extractions)
+            try:
+                if extraction is None:
+                    raise ValueError("Text extraction failed")
+                
+                text, truncation = extraction
+                resume_data = next(parsed)
+                if isinstance(resume_data, Exception):
+                    raise resume_data
+                if truncation:
+                    resume_data["extraction_truncated"] = truncation
+                
+                print(f"\nProcessing: {filename}")
+                print(f"Extracted data - Name: {resume_data.get('Full Name', 'N/A')}, Email: {resume_data.get('Email Address', 'N/A')}, Phone: {resume_data.get('Contact Number', 'N/A')}")
+                
+                batch.append(resume_data)
+                batch_data.append(data)
+            
+            except Exception as e:
+                print(f"Error processing file {filename}: {e}")
+                import traceback
+                traceback.print_exc()
+                results['failed_files'].append(filename)
+        else:
+            results['failed_files'].append(filename)
+    
+    # Duplicates within the batch are collapsed in memory before anything is stored
+    outcomes, survivors = find_and_delete_batch_duplicates(batch)
+    to_store = set(id(resume_data) for resume_data in survivors)
+    for resume_data, data, (deleted_count, duplicates_info) in zip(batch, batch_data, outcomes):
+        results['duplicate_count'] += deleted_count
+        results['duplicates'].extend(duplicates_info)
+        
+        if deleted_count > 0:
+            print(f"Found and removed {deleted_count} duplicate(s) for {resume_data['filename']}")
+        else:
+            print(f"No duplicates found for {resume_data['filename']}")
+        
+        if id(resume_data) in to_store:
+            # Save CV file for URL access; superseded resumes never get one
+            try:
+                save_cv_file(data, resume_data["cv_filename"])
+            except Exception as e:
+                print(f"Error saving CV file for {resume_data['filename']}: {e}")
+                results['failed_files'].append(resume_data['filename'])
+                continue
+            store_resume(resume_data)
+        results['processed_resumes'].append(resume_data)
+    
+    return results
+
+def new_batch_results():
+    return {
+        'processed_resumes': [],
+        'failed_files': [],
+        'duplicates': [],
+        'duplicate_count': 0
+    }
+
+def batch_response(results):
+    print(f"\nSummary:")
+    print(f"- Processed: {len(results['processed_resumes'])} resumes")
+    print(f"- Failed: {len(results['failed_files'])} files")
+    print(f"- Total duplicates removed: {results['duplicate_count']}")
+    
+    return jsonify({
+        'success': True,
+        'processed_count': len(results['processed_resumes']),
+        'failed_count': len(results['failed_files']),
+        'duplicate_count': results['duplicate_count'],
+        'processed_resumes': results['processed_resumes'],
+        'failed_files': results['failed_files'],
+        'duplicates': results['duplicates']
+    })
+
+# Helper function to check for a supported archive type
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+# Yield (filename, data) for each archive member without unpacking the archive to disk
+def iter_archive_members(archive_file, archive_name):
+    """data is None for members that are not allowed resume types or are too large"""
+    max_member_size = app.config['ARCHIVE_MAX_MEMBER_SIZE']
+    
+    def skip_member(name):
+        # Directories and macOS resource-fork entries are neither resumes nor failures
+        base_name = name.rsplit('/', 1)[-1]
+        return not base_name or name.startswith('__MACOSX/') or base_name.startswith('._')
+    
+    def read_member(member_file):
+        data = member_file.read(max_member_size + 1)
+        return data if len(data) <= max_member_size else None
+    
+    count = 0
+    if archive_name.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_file) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or skip_member(info.filename):
+                    continue
+                count += 1
+                if count > app.config['ARCHIVE_MAX_MEMBERS']:
+                    raise ValueError(f"Archive has more than {app.config['ARCHIVE_MAX_MEMBERS']} files")
+                if not allowed_file(info.filename) or info.file_size > max_member_size:
+                    yield info.filename, None
+                    continue
+                with archive.open(info) as member_file:
+                    yield info.filename, read_member(member_file)
+    else:
+        # Stream mode reads members sequentially, so the archive never needs to be seekable
+        with tarfile.open(fileobj=archive_file, mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile() or skip_member(member.name):
+                    continue
+                count += 1
+                if count > app.config['ARCHIVE_MAX_MEMBERS']:
+                    raise ValueError(f"Archive has more than {app.config['ARCHIVE_MAX_MEMBERS']} files")
+                if not allowed_file(member.name) or member.size > max_member_size:
+                    yield member.name, None
+                    continue
+                yield member.name, read_member(archive.extractfile(member))
+
+# Route every resume in an archive through the batch pipeline, a few members at a time
+def ingest_archive(archive_file, archive_name, results):
+    batch = []
+    for member in iter_archive_members(archive_file, archive_name):
+        batch.append(member)
+        if len(batch) >= app.config['ARCHIVE_BATCH_SIZE']:
+            process_resume_batch(batch, results)
+            batch = []
+    if batch:
+        process_resume_batch(batch, results)
+    return results
+
 @app.route('/upload_resumes', methods=['POST'])
 def upload_resumes():
     if 'resumes' not in request.files:
@@ -1323,79 +3083,312 @@ def upload_resumes():
     if not files or all(file.filename == '' for file in files):
         return jsonify({'error': 'No files selected'})
     
-    processed_resumes = []
-    failed_files = []
-    all_duplicates_info = []
-    total_deleted = 0
-    
+    # Read all files first so their text can be extracted in parallel
+    uploads = []
     for file in files:
+        data = None
         if file and allowed_file(file.filename):
             try:
-                filename = str(uuid.uuid4()) + '_' + secure_filename(file.filename)
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                
-                file.save(file_path)
-                
-                text = extract_text(file_path)
-                resume_data = parse_resume(text, file.filename)
-                
-                # Save CV file for URL access
-                cv_file_path = os.path.join(app.config['CV_FOLDER'], resume_data["cv_filename"])
-                import shutil
-                shutil.copy2(file_path, cv_file_path)
-                
-                print(f"\nProcessing: {file.filename}")
-                print(f"Extracted data - Name: {resume_data.get('Full Name', 'N/A')}, Email: {resume_data.get('Email Address', 'N/A')}, Phone: {resume_data.get('Contact Number', 'N/A')}")
-                
-                deleted_count, duplicates_info = find_and_delete_duplicates(resume_data)
-                total_deleted += deleted_count
-                all_duplicates_info.extend(duplicates_info)
-                
-                if deleted_count > 0:
-                    print(f"Found and removed {deleted_count} duplicate(s) for {file.filename}")
-                else:
-                    print(f"No duplicates found for {file.filename}")
-                
-                try:
-                    if mongodb_available:
-                        resume_id = resumes_collection.insert_one(resume_data).inserted_id
-                        resume_data['_id'] = str(resume_id)
-                        print(f"Saved to MongoDB with ID: {resume_id}")
-                    else:
-                        resume_data['_id'] = str(uuid.uuid4())
-                        resumes_data.append(resume_data)
-                        print(f"Saved to in-memory storage with ID: {resume_data['_id']}")
-                except Exception as e:
-                    print(f"MongoDB error: {e}")
-                    resume_data['_id'] = str(uuid.uuid4())
-                    resumes_data.append(resume_data)
-                    print(f"Fallback: Saved to in-memory storage with ID: {resume_data['_id']}")
-                
-                processed_resumes.append(resume_data)
-                
-                os.remove(file_path)
-                
+                data = read_upload(file)
             except Exception as e:
-                print(f"Error processing file {file.filename}: {e}")
-                import traceback
-                traceback.print_exc()
-                failed_files.append(file.filename)
-        else:
-            failed_files.append(file.filename)
+                print(f"Error reading file {file.filename}: {e}")
+        uploads.append((file.filename, data))
     
-    print(f"\nSummary:")
-    print(f"- Processed: {len(processed_resumes)} resumes")
-    print(f"- Failed: {len(failed_files)} files")
-    print(f"- Total duplicates removed: {total_deleted}")
+    results = process_resume_batch(uploads, new_batch_results())
+    return batch_response(results)
+
+@app.route('/upload_resume_archive', methods=['POST'])
+def upload_resume_archive():
+    if 'archive' not in request.files:
+        return jsonify({'error': 'No archive uploaded'})
+    
+    archive = request.files['archive']
+    
+    if archive.filename == '':
+        return jsonify({'error': 'No archive selected'})
+    
+    if not is_archive(archive.filename):
+        return jsonify({'error': 'Archive type not allowed'})
+    
+    results = new_batch_results()
+    try:
+        ingest_archive(archive.stream, archive.filename, results)
+    except Exception as e:
+        print(f"Error reading archive {archive.filename}: {e}")
+        return jsonify({
+            'error': f'Error reading archive: {str(e)}',
+            'processed_count': len(results['processed_resumes']),
+            'processed_resumes': results['processed_resumes'],
+            'failed_files': results['failed_files']
+        })
+    
+    return batch_response(results)
+
+# Exclusive lock on a file, held across threads of this process and across other processes
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.Lock()
+        self.file = None
+    
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, 'a+b')
+            if fcntl:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            else:
+                self.file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK gives up after about 10 seconds
+        except BaseException:
+            if self.file:
+                self.file.close()
+                self.file = None
+            self.thread_lock.release()
+            raise
+        return self
+    
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+            self.thread_lock.release()
+
+# Chunked upload sessions live under UPLOAD_FOLDER/chunked/<upload_id>/ with a JSON manifest.
+# Manifest read-modify-writes hold this lock, so they are safe with several server workers.
+chunked_upload_lock = FileLock(os.path.join(app.config['UPLOAD_FOLDER'], 'chunked', '.lock'))
+
+def chunked_upload_dir(upload_id):
+    if not re.fullmatch(r'[0-9a-f]{32}', upload_id or ''):
+        return None
+    return os.path.join(app.config['UPLOAD_FOLDER'], 'chunked', upload_id)
+
+def load_chunked_manifest(upload_id):
+    upload_dir = chunked_upload_dir(upload_id)
+    if not upload_dir:
+        return None
+    try:
+        with open(os.path.join(upload_dir, 'manifest.json'), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def save_chunked_manifest(upload_id, manifest):
+    manifest_path = os.path.join(chunked_upload_dir(upload_id), 'manifest.json')
+    temp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    os.replace(temp_path, manifest_path)
+
+# Merge a received byte range [start, end) into a sorted list of disjoint ranges
+def add_received_range(ranges, start, end):
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+def missing_ranges(ranges, size):
+    missing = []
+    position = 0
+    for range_start, range_end in ranges:
+        if range_start > position:
+            missing.append([position, range_start])
+        position = max(position, range_end)
+    if position < size:
+        missing.append([position, size])
+    return missing
+
+def chunked_upload_status(upload_id, manifest):
+    files = []
+    for index, file_info in enumerate(manifest['files']):
+        files.append({
+            'index': index,
+            'filename': file_info['filename'],
+            'size': file_info['size'],
+            'received': sum(end - start for start, end in file_info['ranges']),
+            'missing': missing_ranges(file_info['ranges'], file_info['size'])
+        })
+    return {
+        'upload_id': upload_id,
+        'chunk_size': app.config['CHUNKED_UPLOAD_CHUNK_SIZE'],
+        'complete': all(not file_info['missing'] for file_info in files),
+        'files': files
+    }
+
+# Remove chunked upload sessions that were abandoned before finalize
+def remove_stale_chunked_uploads():
+    chunked_root = os.path.join(app.config['UPLOAD_FOLDER'], 'chunked')
+    if not os.path.exists(chunked_root):
+        return
+    now = time.time()
+    for entry in os.scandir(chunked_root):
+        try:
+            if entry.is_dir() and now - entry.stat().st_mtime > app.config['CHUNKED_UPLOAD_TTL_SECONDS']:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except Exception as e:
+            print(f"Error removing stale chunked upload {entry.name}: {e}")
+
+@app.route('/upload_resumes/init', methods=['POST'])
+def init_chunked_upload():
+    """Start a resumable upload; the body lists the files as {"files": [{"filename", "size"}]}"""
+    payload = request.json or {}
+    files = payload.get('files') or []
+    
+    if not files:
+        return jsonify({'error': 'No files declared'})
+    
+    manifest_files = []
+    total_size = 0
+    for file_info in files:
+        filename = str(file_info.get('filename', ''))
+        try:
+            size = int(file_info.get('size', -1))
+        except (TypeError, ValueError):
+            size = -1
+        if not filename or size < 0:
+            return jsonify({'error': 'Each file needs a filename and a size'})
+        if not (allowed_file(filename) or is_archive(filename)):
+            return jsonify({'error': f'File type not allowed: {filename}'})
+        if not is_archive(filename) and size > app.config['ARCHIVE_MAX_MEMBER_SIZE']:
+            return jsonify({'error': f'File too large: {filename}'})
+        total_size += size
+        manifest_files.append({'filename': filename, 'size': size, 'ranges': []})
+    
+    if total_size > app.config['CHUNKED_UPLOAD_MAX_BYTES']:
+        return jsonify({'error': 'Upload exceeds the maximum batch size'})
+    
+    remove_stale_chunked_uploads()
+    
+    upload_id = uuid.uuid4().hex
+    upload_dir = chunked_upload_dir(upload_id)
+    os.makedirs(upload_dir)
+    for index, file_info in enumerate(manifest_files):
+        with open(os.path.join(upload_dir, f"{index}.part"), 'wb') as part_file:
+            part_file.truncate(file_info['size'])
+    
+    manifest = {'created': time.time(), 'finalizing': False, 'files': manifest_files}
+    save_chunked_manifest(upload_id, manifest)
+    return jsonify(chunked_upload_status(upload_id, manifest))
+
+@app.route('/upload_resumes/<upload_id>', methods=['GET'])
+def get_chunked_upload(upload_id):
+    """Report received and missing byte ranges so a client can resume after a disconnect"""
+    manifest = load_chunked_manifest(upload_id)
+    if not manifest:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(chunked_upload_status(upload_id, manifest))
+
+@app.route('/upload_resumes/<upload_id>/<int:file_index>', methods=['PUT'])
+def put_chunked_upload(upload_id, file_index):
+    """Store the request body at ?offset= within the given file"""
+    manifest = load_chunked_manifest(upload_id)
+    if not manifest:
+        return jsonify({'error': 'Upload not found'}), 404
+    if manifest['finalizing']:
+        return jsonify({'error': 'Upload is already being finalized'}), 409
+    if file_index < 0 or file_index >= len(manifest['files']):
+        return jsonify({'error': 'Unknown file index'}), 404
+    
+    offset = request.args.get('offset', type=int)
+    chunk = request.get_data(cache=False)
+    size = manifest['files'][file_index]['size']
+    if offset is None or offset < 0 or offset + len(chunk) > size:
+        return jsonify({'error': 'Chunk does not fit within the declared file size'}), 416
+    
+    # Chunks cover disjoint byte ranges, so they can be written without holding the lock;
+    # a finalize that completes meanwhile removes the upload, which is checked again below
+    try:
+        with open(os.path.join(chunked_upload_dir(upload_id), f"{file_index}.part"), 'r+b') as part_file:
+            part_file.seek(offset)
+            part_file.write(chunk)
+    except FileNotFoundError:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    with chunked_upload_lock:
+        manifest = load_chunked_manifest(upload_id)
+        if not manifest:
+            return jsonify({'error': 'Upload not found'}), 404
+        if manifest['finalizing']:
+            return jsonify({'error': 'Upload is already being finalized'}), 409
+        file_info = manifest['files'][file_index]
+        file_info['ranges'] = add_received_range(file_info['ranges'], offset, offset + len(chunk))
+        save_chunked_manifest(upload_id, manifest)
+    
+    return jsonify(chunked_upload_status(upload_id, manifest))
+
+@app.route('/upload_resumes/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    """Process a fully received upload through the same pipeline as /upload_resumes"""
+    with chunked_upload_lock:
+        manifest = load_chunked_manifest(upload_id)
+        if not manifest:
+            return jsonify({'error': 'Upload not found'}), 404
+        status = chunked_upload_status(upload_id, manifest)
+        if not status['complete']:
+            return jsonify(dict(status, error='Upload is incomplete')), 409
+        if manifest['finalizing']:
+            return jsonify({'error': 'Upload is already being finalized'}), 409
+        manifest['finalizing'] = True
+        save_chunked_manifest(upload_id, manifest)
+    
+    upload_dir = chunked_upload_dir(upload_id)
+    results = new_batch_results()
+    try:
+        batch = []
+        for index, file_info in enumerate(manifest['files']):
+            part_path = os.path.join(upload_dir, f"{index}.part")
+            if is_archive(file_info['filename']):
+                with open(part_path, 'rb') as archive_file:
+                    ingest_archive(archive_file, file_info['filename'], results)
+                continue
+            with open(part_path, 'rb') as part_file:
+                batch.append((file_info['filename'], part_file.read()))
+            if len(batch) >= app.config['ARCHIVE_BATCH_SIZE']:
+                process_resume_batch(batch, results)
+                batch = []
+        if batch:
+            process_resume_batch(batch, results)
+    except Exception as e:
+        print(f"Error finalizing chunked upload {upload_id}: {e}")
+        results['error'] = f'Error processing upload: {str(e)}'
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
     
+    if 'error' in results:
+        return jsonify({
+            'error': results['error'],
+            'processed_count': len(results['processed_resumes']),
+            'processed_resumes': results['processed_resumes'],
+            'failed_files': results['failed_files']
+        })
+    return batch_response(results)
+
+@app.route('/ai_circuit_status', methods=['GET'])
+def ai_circuit_status():
+    """State and counters of the circuit breaker guarding Gemini calls in this process"""
+    return jsonify(ai_circuit_breaker.status())
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Hit-rate counters for this process's extraction and AI parse caches"""
     return jsonify({
-        'success': True,
-        'processed_count': len(processed_resumes),
-        'failed_count': len(failed_files),
-        'duplicate_count': total_deleted,
-        'processed_resumes': processed_resumes,
-        'failed_files': failed_files,
-        'duplicates': all_duplicates_info
+        'extraction_cache': extraction_cache.stats(),
+        'ai_cache': ai_cache.stats()
     })
 
 @app.route('/get_resumes', methods=['GET'])
@@ -1406,10 +3399,10 @@ def get_resumes():
             for resume in resumes:
                 resume['_id'] = str(resume['_id'])
         else:
-            resumes = resumes_data
+            resumes = list(resumes_data)
     except Exception as e:
         print(f"MongoDB error: {e}")
-        resumes = resumes_data
+        resumes = list(resumes_data)
     
     return jsonify(resumes)
 
@@ -1426,9 +3419,9 @@ def get_resume(resume_id):
             except Exception as e:
                 print(f"MongoDB error: {e}")
         
-        for resume in resumes_data:
-            if resume['_id'] == resume_id:
-                return jsonify(resume)
+        resume = resumes_data.get(resume_id)
+        if resume:
+            return jsonify(resume)
     except Exception as e:
         print(f"Error retrieving resume: {e}")
     
@@ -1446,8 +3439,9 @@ def search_resumes():
             for resume in resumes:
                 resume['_id'] = str(resume['_id'])
         else:
-            resumes = resumes_data
+            resumes = list(resumes_data)
         
+        skill_id = SKILL_TAXONOMY.skill_id(skill)
         scored_resumes = []
         for resume in resumes:
             has_skill = False
@@ -1474,6 +3468,9 @@ def search_resumes():
                         if skill_lower == resume_skill_lower or skill_lower in resume_skill_lower or resume_skill_lower in skill_lower:
                             has_skill = True
                             break
+                        if skill_id is not None and SKILL_TAXONOMY.skill_id(resume_skill) == skill_id:
+                            has_skill = True
+                            break
             
             if has_skill:
                 score = score_resume(resume, skill)
@@ -1506,7 +3503,7 @@ def get_filter_options():
             for resume in resumes:
                 resume['_id'] = str(resume['_id'])
         else:
-            resumes = resumes_data
+            resumes = list(resumes_data)
         
         # Extract unique values for each filter category
         locations = set()
@@ -1576,7 +3573,7 @@ def filter_resumes():
             for resume in resumes:
                 resume['_id'] = str(resume['_id'])
         else:
-            resumes = resumes_data
+            resumes = list(resumes_data)
         
         filtered_resumes = []
         
@@ -1847,5 +3844,26 @@ def save_application():
             'application_id': application_data['_id']
         })
 
+@app.cli.command('backfill-dedup-keys')
+def backfill_dedup_keys_command():
+    """Create the resume indexes and store dedup_keys on resume records saved before duplicate
+    detection used them. The first upload does the same; this runs it ahead of time."""
+    if not mongodb_available:
+        print("MongoDB is not available; in-memory records get their keys when they are stored")
+        return
+    create_resume_indexes()
+    print(f"Backfilled dedup_keys on {backfill_dedup_keys()} resume record(s)")
+
+@app.cli.command('gc-cv-files')
+def gc_cv_files_command():
+    """Delete CV files that are no longer referenced by any resume record"""
+    if not mongodb_available:
+        print("MongoDB is not available; in-memory records are not visible to this command")
+        return
+    removed = collect_orphaned_cv_files()
+    print(f"Removed {len(removed)} orphaned CV file(s)")
+    for cv_filename in removed:
+        print(f"  - {cv_filename}")
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,669 @@
+"""Benchmark the rule-based resume parser on synthetic resumes.
+
+    python benchmark_parser.py --count 3000
+
+Runs parse_resume_rule_based over the same corpus three times: once with the precompiled
+PATTERN_REGISTRY, once with every registry entry replaced by a shim that hands the
+pattern string to the re module on each call, which is how the extractors used to work,
+and once with the bare compiled patterns to show what the regex guard costs.
+All runs must produce identical results.
+
+It also checks that match_section_header assigns every line of the corpus, plus a set of
+awkward header lines, to the same section as the original per-pattern loop, and times both.
+Likewise the skill automaton is checked against one regex per skill, and timed again with
+the dictionary padded to --dictionary-size entries to show that its cost does not grow with it.
+The skill lists and per-category order derived from the taxonomy file must match the lists
+app.py used to hard-code.
+
+Finally every entry in LINEAR_PATTERN_REWRITES is fuzzed against the pattern it replaces, and
+resumes stuffed with long runs of backtracking bait are parsed at each of --hostile-sizes to
+show that the worst case grows linearly with the input. The original patterns are timed on the
+smallest size only, since they take minutes on the larger ones.
+
+The corpus is also run through parse_resumes, serially and with --workers threads, and each
+result must serialize to the same JSON as calling parse_resume once per resume. Gemini is
+switched off for this, so only the rule-based parser runs.
+
+The AI circuit breaker is driven through scripted call sequences, including calls that finish
+after the breaker has moved on, to check its half-open accounting.
+
+Duplicate detection is replayed over random uploads that share names, emails and phone numbers
+in different spellings, one at a time and in batches. What it reports and removes must match
+the original scan over every stored resume, and the ResumeStore indexes must agree with its
+records. Batches uploaded through process_resume_batch must leave no CV file for a resume
+superseded within its batch. A lookup is also timed against --count stored resumes, by full
+scan and through the indexes. With --mongo-uri the replay also runs against MongoDB, starting
+each sequence with records saved without dedup_keys to check that they are backfilled and
+matched.
+"""
+import json
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import time
+import uuid
+
+from pymongo import MongoClient
+
+# app prints its service setup on import
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+
+FIRST_NAMES = ["Aina", "John", "Maria", "Wei", "Fatima", "Carlos", "Priya", "Liam", "Sara", "Omar"]
+LAST_NAMES = ["Hyder", "Smith", "Garcia", "Chen", "Khan", "Lopez", "Patel", "Brown", "Ali", "Novak"]
+CITIES = ["Lahore, Pakistan", "New York, USA", "Berlin, Germany", "Toronto, Canada", "Dubai, UAE"]
+DEGREES = ["Bachelor of Science in Computer Science", "Master of Science in Data Science",
+           "B.Tech in Information Technology", "PhD in Artificial Intelligence"]
+SCHOOLS = ["National University", "Stanford University", "City College", "Institute of Technology"]
+ROLES = ["Software Engineer", "Senior Data Analyst", "Backend Developer", "Cloud Architect", "Web Developer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Systems", "Stark Industries"]
+FILLER = ("Built and maintained services used by thousands of customers, worked with cross-functional "
+          "teams, improved reliability and reduced costs across several releases.")
+
+# Pattern object that goes through re's internal cache on every call, like the old extractors
+class UncompiledPattern:
+    def __init__(self, compiled):
+        self.pattern = compiled.pattern
+        self.flags = compiled.flags
+        self.groups = compiled.groups
+
+    def search(self, string):
+        return re.search(self.pattern, string, self.flags)
+
+    def match(self, string):
+        return re.match(self.pattern, string, self.flags)
+
+    def findall(self, string):
+        return re.findall(self.pattern, string, self.flags)
+
+    def finditer(self, string):
+        return re.finditer(self.pattern, string, self.flags)
+
+def uncompiled(entry):
+    if isinstance(entry, dict):
+        return {key: uncompiled(value) for key, value in entry.items()}
+    if isinstance(entry, list):
+        return [uncompiled(value) for value in entry]
+    return app.GuardedPattern(UncompiledPattern(entry))
+
+# The registry without GuardedPattern, to measure what the guard costs
+def unguarded(entry):
+    if isinstance(entry, dict):
+        return {key: unguarded(value) for key, value in entry.items()}
+    if isinstance(entry, list):
+        return [unguarded(value) for value in entry]
+    return entry.regex
+
+# The section matcher as it was before the combined pattern: every section, every pattern
+def reference_section_header(line):
+    for section, patterns in app.SECTION_PATTERNS.items():
+        for pattern in patterns:
+            if re.search(pattern, line, re.IGNORECASE) and len(line) < 50:
+                return section
+    return None
+
+# Header lines where several sections match, in different positions and overlaps
+SECTION_EDGE_CASES = [
+    "Work Experience and Education", "EDUCATION & EXPERIENCE", "Skills / Expertise",
+    "Technical Skills", "Personal Projects", "Academic Projects", "Academic Qualifications",
+    "Contact", "Contact Information", "About Me", "Languages and Interests",
+    "References available on request", "Hobbies & Activities", "Certificates and Degrees",
+    "Professional Experience", "Employment History", "Language Proficiency",
+    "Key competencies in contact centres", "experiencecontact", "Degree of personal interest",
+    "Referees", "Accreditations", "work   history", "x" * 49 + "skills", "skills" + " " * 44,
+    "", "Summary", "Python, Java, SQL", "Education" * 6,
+]
+
+def check_section_parity(texts):
+    lines = list(SECTION_EDGE_CASES)
+    for text in texts:
+        lines.extend(line.strip() for line in text.split("\n") if line.strip())
+    mismatches = [line for line in lines if app.match_section_header(line) != reference_section_header(line)]
+    if mismatches:
+        raise SystemExit(f"Section assignment differs for {len(mismatches)} lines, e.g. {mismatches[:3]}")
+    return len(lines)
+
+def time_segmentation(texts, header_matcher):
+    original_matcher = app.match_section_header
+    app.match_section_header = header_matcher
+    try:
+        start = time.perf_counter()
+        sections = [app.identify_sections(text) for text in texts]
+        return time.perf_counter() - start, sections
+    finally:
+        app.match_section_header = original_matcher
+
+# The skill search as it was before the automaton: one regex per dictionary entry
+def reference_skills(text, skills):
+    found = []
+    for skill in skills:
+        if re.search(r'\b' + re.escape(skill) + r'\b', text, re.IGNORECASE) and skill not in found:
+            found.append(skill)
+    return found
+
+# The skill lists app.py had before the taxonomy file, in their report order
+ORIGINAL_TECHNICAL_SKILLS = [
+    "Python", "JavaScript", "Java", "C++", "C#", "PHP", "Ruby", "Swift", "Kotlin", "Go",
+    "React", "Angular", "Vue.js", "Node.js", "Express", "Django", "Flask", "Spring Boot",
+    "HTML", "CSS", "SQL", "MongoDB", "PostgreSQL", "MySQL", "Oracle", "Firebase",
+    "AWS", "Azure", "Google Cloud", "Docker", "Kubernetes", "Git", "CI/CD",
+    "Machine Learning", "Data Science", "Artificial Intelligence", "Deep Learning",
+    "TensorFlow", "PyTorch", "Pandas", "NumPy", "Scikit-learn", "R", "Tableau", "Power BI",
+    "Mobile Development", "Web Development", "Full Stack", "Frontend", "Backend", "DevOps",
+    "Agile", "Scrum", "REST API", "GraphQL", "Microservices", "Linux", "Windows",
+    "Networking", "Security", "Blockchain", "IoT", "AR/VR", "Game Development",
+    "Solidity", "Ethereum", "Smart Contracts", "Web3", "DApp", "Hardhat", "Truffle",
+    "Project Management", "Digital Marketing", "Teamwork", "Time Management", "Leadership",
+    "Effective Communication", "Critical Thinking", "Problem Solving", "Analytical Skills"
+]
+ORIGINAL_SOFT_SKILLS = [
+    "Communication", "Leadership", "Teamwork", "Problem Solving", "Critical Thinking",
+    "Time Management", "Adaptability", "Creativity", "Project Management", "Collaboration",
+    "Attention to Detail", "Organization", "Analytical Skills", "Interpersonal Skills",
+    "Presentation Skills", "Negotiation", "Conflict Resolution", "Decision Making",
+    "Emotional Intelligence", "Flexibility"
+]
+
+def check_skill_order(texts):
+    original = {"Technical": ORIGINAL_TECHNICAL_SKILLS, "Soft": ORIGINAL_SOFT_SKILLS}
+    if {"Technical": app.TECHNICAL_SKILLS, "Soft": app.SOFT_SKILLS} != original:
+        raise SystemExit("Skill lists derived from the taxonomy differ from the original lists")
+    taxonomy = app.SKILL_TAXONOMY
+    if taxonomy.categorize(reversed(range(len(taxonomy.names)))) != original:
+        raise SystemExit("SkillTaxonomy.categorize does not follow the original list order")
+    # Canonical names only: aliases find skills the original lists could not
+    matcher = app.SkillMatcher((name, skill_id) for skill_id, name in enumerate(taxonomy.names))
+    for text in texts:
+        expected = {category: reference_skills(text, skills) for category, skills in original.items()}
+        if taxonomy.categorize(matcher.find(text)) != expected:
+            raise SystemExit("Categorized skills differ from the original lists' matches")
+
+def check_skill_parity(texts, dictionaries):
+    for category, skills in dictionaries.items():
+        matcher = app.SkillMatcher((skill, skill) for skill in skills)
+        for text in texts:
+            if matcher.find(text) != reference_skills(text, skills):
+                raise SystemExit(f"{category} skills differ from the per-skill regexes")
+
+def time_skills(texts, find):
+    start = time.perf_counter()
+    for text in texts:
+        find(text)
+    return time.perf_counter() - start
+
+def synthetic_skill_names(rng, count):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 12))).title() for _ in range(count)]
+
+# Fragments the rewritten patterns are fuzzed with: their characters, keywords and run shapes
+REWRITE_FUZZ_TOKENS = ["A", "a", "x", "1", ".", ",", "&", "-", "|", "@", "!", "\u00e9", "\u017f", " ", "  ", "\t", "\n",
+                       " \n", "at", "with", "for", "Engineer", "developer", "Smith", "example.com"]
+
+def rewritten_patterns():
+    """(original, registry pattern) for every registry entry that uses a linear rewrite"""
+    originals = {rewrite: original for original, rewrite in app.LINEAR_PATTERN_REWRITES.items()}
+    for entry in app.PATTERN_REGISTRY.values():
+        for pattern in entry if isinstance(entry, list) else [entry]:
+            if pattern.pattern in originals:
+                yield re.compile(originals[pattern.pattern], pattern.flags), pattern
+
+def check_rewrite_parity(rng, samples):
+    pairs = list(rewritten_patterns())
+    for _ in range(samples):
+        text = "".join(rng.choice(REWRITE_FUZZ_TOKENS) for _ in range(rng.randint(0, 40)))
+        for original, rewrite in pairs:
+            if app.first_match_text(original, text) != app.first_match_text(rewrite, text):
+                raise SystemExit(f"Rewrite of {original.pattern!r} finds a different first match in {text!r}")
+    return len(pairs)
+
+# Runs that made the original patterns backtrack: blanks, letters and address characters that
+# almost, but never quite, complete a match
+HOSTILE_ATOMS = [" ", "\n", " \n", "\t", "a.", "a-", "Abc ", "in ", "senior ", "at ", "Ab  ", "a,"]
+
+def hostile_resume(rng, size):
+    """A resume whose every section is one long run of a hostile atom"""
+    parts = []
+    for header in ("", "Contact", "Education", "Work Experience", "Skills", "Projects"):
+        atom = rng.choice(HOSTILE_ATOMS)
+        parts.append(header + "\n" + atom * (size // (6 * len(atom))) + rng.choice(["!", "", "\n", "@"]))
+    text = "\n".join(parts)
+    # Without capitals only the last name pattern applies
+    return text.lower() if rng.random() < 0.5 else text
+
+def time_worst_case(texts):
+    worst = 0
+    for text in texts:
+        start = time.perf_counter()
+        app.parse_resume_rule_based(text, "resume.pdf")
+        worst = max(worst, time.perf_counter() - start)
+    return worst
+
+def synthetic_resume(rng):
+    first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    start_year = rng.randint(1995, 2015)
+    lines = [
+        f"{first_name} {last_name}",
+        f"Email: {first_name.lower()}.{last_name.lower()}{rng.randint(1, 999)}@example.com",
+        f"Phone: +92 {rng.randint(300, 349)} {rng.randint(1000000, 9999999)}",
+        f"Location: {rng.choice(CITIES)}",
+        "",
+        "Professional Summary",
+        FILLER,
+        "",
+        "Skills",
+        ", ".join(rng.sample(app.TECHNICAL_SKILLS, rng.randint(4, 12))),
+        ", ".join(rng.sample(app.SOFT_SKILLS, rng.randint(2, 5))),
+        "",
+        "Education",
+        f"{rng.choice(DEGREES)}, {rng.choice(SCHOOLS)} {start_year}-{start_year + 4}",
+        "",
+        "Work Experience",
+    ]
+    year = start_year + 4
+    for _ in range(rng.randint(1, 4)):
+        lines.append(f"{rng.choice(ROLES)} at {rng.choice(COMPANIES)} {year}-{year + 2}")
+        lines.extend([FILLER] * rng.randint(1, 3))
+        year += 2
+    lines.extend(["", "Projects", "Resume Parser", FILLER, "", "Languages", "English, Urdu"])
+    return "\n".join(lines)
+
+def parse_corpus(texts):
+    """Best of two runs, so the first run's warm-up does not count against either mode"""
+    timings = []
+    for _ in range(2):
+        results = []
+        start = time.perf_counter()
+        for text in texts:
+            resume_data = app.parse_resume_rule_based(text, "resume.pdf")
+            for key in ("upload_date", "cv_url", "cv_filename"):
+                resume_data.pop(key, None)
+            results.append(resume_data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), results
+
+def strip_volatile(resume_data):
+    for key in ("upload_date", "cv_url", "cv_filename"):
+        resume_data.pop(key, None)
+    return json.dumps(resume_data, default=str)
+
+def time_batch_parsing(texts, workers):
+    """Per-item parse_resume against parse_resumes with one and with several workers"""
+    gemini_available = app.gemini_available
+    app.gemini_available = False
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            per_item = [strip_volatile(app.parse_resume(text, "resume.pdf")) for text in texts]
+            per_item_seconds = time.perf_counter() - start
+            batch_seconds = {}
+            for worker_count in (1, workers):
+                start = time.perf_counter()
+                batch = [strip_volatile(resume_data)
+                         for resume_data in app.parse_resumes(((text, "resume.pdf") for text in texts), worker_count)]
+                batch_seconds[worker_count] = time.perf_counter() - start
+                if batch != per_item:
+                    raise SystemExit(f"parse_resumes with {worker_count} worker(s) differs from per-item parse_resume")
+    finally:
+        app.gemini_available = gemini_available
+    return per_item_seconds, batch_seconds
+
+def check_circuit_breaker():
+    """Replay call orderings against CircuitBreaker; returns the number of scenarios checked"""
+    def new_breaker(probes):
+        # Two failures open it, and it goes half-open as soon as it is asked again
+        return app.CircuitBreaker(window_seconds=60, min_calls=2, error_rate_threshold=0.5,
+                                  p95_threshold=60, open_seconds=0, half_open_probes=probes)
+
+    def expect(breaker, state, probes_in_flight, scenario):
+        if (breaker.state, breaker.probes_in_flight) != (state, probes_in_flight):
+            raise SystemExit(f"Circuit breaker {scenario}: expected {state} with {probes_in_flight} probe(s) "
+                             f"in flight, got {breaker.state} with {breaker.probes_in_flight}")
+
+    def fail_twice(breaker):
+        for _ in range(2):
+            breaker.allow_request()
+            breaker.record(False, 0.1)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # A call admitted while closed finishes during half-open: it must not close the breaker
+        breaker = new_breaker(probes=1)
+        early_allowed, early_probe = breaker.allow_request()
+        fail_twice(breaker)
+        probe_allowed, probe = breaker.allow_request()
+        if not early_allowed or early_probe is not None or not probe_allowed or probe is None:
+            raise SystemExit("Circuit breaker: expected an ordinary call and then a probe")
+        breaker.record(True, 0.1, early_probe)
+        expect(breaker, "half_open", 1, "after a late ordinary call")
+        if breaker.allow_request()[0]:
+            raise SystemExit("Circuit breaker: admitted a second probe while the first was in flight")
+        breaker.record(True, 0.1, probe)
+        expect(breaker, "closed", 0, "after the probe succeeded")
+
+        # A probe from an earlier half-open period finishes after the breaker reopened
+        breaker = new_breaker(probes=2)
+        fail_twice(breaker)
+        first_probe = breaker.allow_request()[1]
+        stale_probe = breaker.allow_request()[1]
+        breaker.record(False, 0.1, first_probe)
+        expect(breaker, "open", 0, "after a probe failed")
+        new_probe = breaker.allow_request()[1]
+        breaker.record(True, 0.1, stale_probe)
+        expect(breaker, "half_open", 1, "after a stale probe")
+        breaker.record(True, 0.1, new_probe)
+        expect(breaker, "half_open", 0, "after one of two probes succeeded")
+        breaker.record(True, 0.1, breaker.allow_request()[1])
+        expect(breaker, "closed", 0, "after both probes succeeded")
+    return 2
+
+def random_identity(rng, number):
+    """Identity fields drawn from small pools, with spellings that normalize to the same key,
+    so uploads often collide on one field and not on the others"""
+    first, last = rng.choice(FIRST_NAMES[:4]), rng.choice(LAST_NAMES[:4])
+    user = rng.randrange(6)
+    digits = f"555{rng.randrange(6):04d}"
+    return {
+        "filename": f"resume-{number}.pdf",
+        # A few shared CV files, as identical uploads share one stored file
+        "cv_filename": f"benchmark-cv-{rng.randrange(4)}.pdf",
+        "Full Name": rng.choice([f"{first} {last}", f" {first.upper()}  {last}", f"Contact {first} {last}", ""]),
+        "Email Address": rng.choice([f"user{user}@example.com", f" USER{user}@Example.com", ""]),
+        "Contact Number": rng.choice([digits, f"({digits[:3]}) {digits[3:]}", ""]),
+    }
+
+def reference_duplicates(stored, resume_data):
+    """The original full scan: removes every record in the stored list that shares a normalized
+    name, email or phone with resume_data, and returns their duplicates_info without IDs"""
+    name = app.normalize_text(resume_data.get("Full Name", ""))
+    email = app.normalize_email(resume_data.get("Email Address", ""))
+    phone = app.normalize_phone(resume_data.get("Contact Number", ""))
+    if not name and not email and not phone:
+        return []
+    duplicates_info = []
+    remaining = []
+    for existing in stored:
+        if name and app.normalize_text(existing.get("Full Name", "")) == name:
+            match_reason = "name"
+        elif email and app.normalize_email(existing.get("Email Address", "")) == email:
+            match_reason = "email"
+        elif phone and app.normalize_phone(existing.get("Contact Number", "")) == phone:
+            match_reason = "phone"
+        else:
+            remaining.append(existing)
+            continue
+        duplicates_info.append({
+            "filename": existing.get("filename", "Unknown"),
+            "name": existing.get("Full Name", "").strip(),
+            "email": existing.get("Email Address", "").strip(),
+            "phone": existing.get("Contact Number", "").strip(),
+            "match_reason": match_reason
+        })
+    stored[:] = remaining
+    return duplicates_info
+
+# The reference scan cannot tell stored records from earlier resumes of the same batch
+def without_storage_fields(duplicates_info):
+    return [{key: value for key, value in info.items() if key not in ("id", "stored")} for info in duplicates_info]
+
+def storage_fields_consistent(duplicates_info, batch_filenames):
+    """Only resumes of the current batch are reported as never stored, and they alone have no id"""
+    return all(info["stored"] == (info["filename"] not in batch_filenames) == (info["id"] is not None)
+               for info in duplicates_info)
+
+def check_store_indexes(store):
+    indexes = {}
+    cv_files = {}
+    for record in store:
+        for field, value in record["dedup_keys"].items():
+            if value:
+                indexes.setdefault(field, {}).setdefault(value, set()).add(record["_id"])
+        if record.get("cv_filename"):
+            cv_files.setdefault(record["cv_filename"], set()).add(record["_id"])
+    if indexes != {field: index for field, index in store.indexes.items() if index} or cv_files != store.cv_files:
+        raise SystemExit("ResumeStore indexes are out of step with its records")
+
+def stored_filenames(collection):
+    if collection is None:
+        return [record["filename"] for record in app.resumes_data]
+    return [record["filename"] for record in collection.find({}, ["filename"]).sort("_id", 1)]
+
+def check_duplicate_detection(rng, trials, collection=None):
+    """Replay random upload sequences through find_and_delete_duplicates, or in batches through
+    find_and_delete_batch_duplicates, storing the survivors with store_resume, and compare every
+    report and the surviving records with the original full scan; returns the number of uploads
+    checked. Uses the in-memory ResumeStore, or the given MongoDB collection, which is emptied
+    before each sequence."""
+    # resumes_collection is only defined when MongoDB was reachable at import
+    saved = app.mongodb_available, getattr(app, "resumes_collection", None), app.resumes_data, app.resume_collection_ready
+    app.mongodb_available = collection is not None
+    app.resumes_collection = collection
+    checked = 0
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for trial in range(trials):
+                app.resumes_data = app.ResumeStore()
+                reference = []
+                if collection is not None:
+                    # Records saved without dedup_keys, which the first lookup has to backfill
+                    collection.delete_many({})
+                    app.resume_collection_ready = False
+                    for number in range(rng.randint(0, 5)):
+                        reference.append(random_identity(rng, f"legacy-{number}"))
+                        collection.insert_one(dict(reference[-1]))
+                uploads = [random_identity(rng, number) for number in range(rng.randint(1, 30))]
+                # Every other sequence goes through the batch path, as multi-file uploads do
+                batched = trial % 2 == 1
+                batch_size = rng.randint(2, 10) if batched else 1
+                for start in range(0, len(uploads), batch_size):
+                    batch = uploads[start:start + batch_size]
+                    expected = []
+                    for resume_data in batch:
+                        expected.append(reference_duplicates(reference, resume_data))
+                        reference.append(resume_data)
+                    batch = [dict(resume_data) for resume_data in batch]
+                    if batched:
+                        outcomes, survivors = app.find_and_delete_batch_duplicates(batch)
+                    else:
+                        outcomes, survivors = [app.find_and_delete_duplicates(batch[0])], batch
+                    for resume_data in survivors:
+                        app.store_resume(resume_data)
+                    batch_filenames = set(resume_data["filename"] for resume_data in batch)
+                    reported = [without_storage_fields(duplicates_info) for deleted_count, duplicates_info in outcomes]
+                    if (reported != expected or any(deleted_count != len(duplicates_info) for deleted_count, duplicates_info in outcomes)
+                            or not all(storage_fields_consistent(duplicates_info, batch_filenames)
+                                       for deleted_count, duplicates_info in outcomes)):
+                        raise SystemExit(f"Duplicate detection reported {outcomes}, expected {expected}")
+                    checked += len(batch)
+                if stored_filenames(collection) != [record["filename"] for record in reference]:
+                    raise SystemExit("Different resumes survive duplicate detection than with the full scan")
+                if collection is None:
+                    check_store_indexes(app.resumes_data)
+    finally:
+        app.mongodb_available, app.resumes_collection, app.resumes_data, app.resume_collection_ready = saved
+    return checked
+
+def check_batch_cv_files(rng, batches):
+    """Upload batches of text resumes through process_resume_batch into an empty CV folder and
+    check that it holds every stored resume's file and none for a resume superseded within its
+    batch; returns the number of superseded resumes. Files of records deleted by a later batch
+    may stay, as the grace window keeps recent files for gc-cv-files."""
+    config_keys = ("CV_FOLDER", "EXTRACTION_WORKERS", "EXTRACTION_CACHE_MAX_BYTES")
+    saved = app.mongodb_available, app.resumes_data, app.gemini_available
+    saved_config = {key: app.app.config[key] for key in config_keys}
+    app.mongodb_available = False
+    app.gemini_available = False
+    app.resumes_data = app.ResumeStore()
+    superseded = 0
+    try:
+        with tempfile.TemporaryDirectory() as cv_folder, contextlib.redirect_stdout(io.StringIO()):
+            app.app.config.update(CV_FOLDER=cv_folder, EXTRACTION_WORKERS=1, EXTRACTION_CACHE_MAX_BYTES=0)
+            number = 0
+            ever_stored = set()
+            for _ in range(batches):
+                uploads = []
+                for _ in range(rng.randint(2, 8)):
+                    number += 1
+                    # Few names and emails, so later uploads in a batch often supersede earlier ones
+                    text = (f"{rng.choice(FIRST_NAMES[:3])} {rng.choice(LAST_NAMES[:3])}\n"
+                            f"user{rng.randrange(4)}@example.com\n\nSummary\nUpload {number}\n")
+                    uploads.append((f"resume-{number}.txt", text.encode()))
+                results = app.new_batch_results()
+                app.process_resume_batch(uploads, results)
+                if results["failed_files"]:
+                    raise SystemExit(f"process_resume_batch failed on {results['failed_files']}")
+                filenames = set(filename for filename, data in uploads)
+                superseded += len(uploads) - sum(1 for record in app.resumes_data if record["filename"] in filenames)
+                stored = set(record["cv_filename"] for record in app.resumes_data)
+                ever_stored.update(stored)
+                files = set(os.listdir(cv_folder))
+                if not stored <= files <= ever_stored:
+                    raise SystemExit(f"CV folder holds {sorted(files - stored)} besides the stored resumes' files, "
+                                     f"and lacks {sorted(stored - files)}")
+    finally:
+        app.mongodb_available, app.resumes_data, app.gemini_available = saved
+        app.app.config.update(saved_config)
+    return superseded
+
+def time_duplicate_lookups(count, lookups=200):
+    """One lookup against count stored resumes, by full scan and through the ResumeStore indexes;
+    none of the lookups match, so nothing is removed between them"""
+    stored = [{"filename": f"resume-{number}.pdf", "Full Name": f"Person {number}",
+               "Email Address": f"person{number}@example.com", "Contact Number": f"{number:09d}"}
+              for number in range(count)]
+    queries = [{"Full Name": f"Nobody {number}", "Email Address": f"nobody{number}@example.com",
+                "Contact Number": f"1{number:09d}"} for number in range(lookups)]
+    start = time.perf_counter()
+    for resume_data in queries:
+        reference_duplicates(stored, resume_data)
+    scan_seconds = time.perf_counter() - start
+
+    saved = app.mongodb_available, app.resumes_data
+    app.mongodb_available = False
+    app.resumes_data = app.ResumeStore()
+    try:
+        for number, record in enumerate(stored):
+            app.resumes_data.append(dict(record, _id=str(number)))
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for resume_data in queries:
+                app.find_and_delete_duplicates(resume_data)
+            indexed_seconds = time.perf_counter() - start
+    finally:
+        app.mongodb_available, app.resumes_data = saved
+    return scan_seconds / lookups, indexed_seconds / lookups
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--count", type=int, default=3000, help="number of synthetic resumes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dictionary-size", type=int, default=20000, help="skills in the padded dictionary")
+    parser.add_argument("--fuzz-samples", type=int, default=20000, help="random strings per rewritten pattern")
+    parser.add_argument("--hostile-count", type=int, default=50, help="hostile resumes per size")
+    parser.add_argument("--hostile-sizes", default="2000,8000,32000", help="comma-separated resume sizes in characters")
+    parser.add_argument("--workers", type=int, default=4, help="threads for the parse_resumes run")
+    parser.add_argument("--dedup-trials", type=int, default=300, help="random upload sequences replayed through duplicate detection")
+    parser.add_argument("--mongo-uri", help="also replay them against this MongoDB, in a scratch database that is dropped afterwards")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = [synthetic_resume(rng) for _ in range(args.count)]
+
+    checked_lines = check_section_parity(texts)
+    reference_seconds, reference_sections = time_segmentation(texts, reference_section_header)
+    combined_seconds, combined_sections = time_segmentation(texts, app.match_section_header)
+    if reference_sections != combined_sections:
+        raise SystemExit("identify_sections results differ between the section matchers")
+
+    dictionaries = {"Technical": app.TECHNICAL_SKILLS, "Soft": app.SOFT_SKILLS}
+    check_skill_parity(texts, dictionaries)
+    check_skill_order(texts)
+    regex_skill_seconds = time_skills(texts, lambda text: [reference_skills(text, skills) for skills in dictionaries.values()])
+    matcher_skill_seconds = time_skills(texts, app.SKILL_TAXONOMY.find_skill_ids)
+    skill_names = app.SKILL_TAXONOMY.names
+    padding = synthetic_skill_names(rng, max(0, args.dictionary_size - len(skill_names)))
+    large_matcher = app.SkillMatcher((name, skill_id) for skill_id, name in enumerate(skill_names + padding))
+    large_matcher_skill_seconds = time_skills(texts, large_matcher.find)
+
+    compiled_registry = dict(app.PATTERN_REGISTRY)
+    try:
+        app.PATTERN_REGISTRY.update(uncompiled(compiled_registry))
+        re.purge()
+        uncompiled_seconds, uncompiled_results = parse_corpus(texts)
+        app.PATTERN_REGISTRY.update(unguarded(compiled_registry))
+        unguarded_seconds, unguarded_results = parse_corpus(texts)
+    finally:
+        app.PATTERN_REGISTRY.update(compiled_registry)
+    compiled_seconds, compiled_results = parse_corpus(texts)
+
+    if not compiled_results == uncompiled_results == unguarded_results:
+        raise SystemExit("Results differ between the compiled, uncompiled and unguarded runs")
+
+    per_item_seconds, batch_seconds = time_batch_parsing(texts, args.workers)
+
+    breaker_scenarios = check_circuit_breaker()
+
+    dedup_checked = check_duplicate_detection(rng, args.dedup_trials)
+    superseded_uploads = check_batch_cv_files(rng, 20)
+    mongo_dedup_checked = 0
+    if args.mongo_uri:
+        client = MongoClient(args.mongo_uri)
+        database = client[f"benchmark_parser_{uuid.uuid4().hex}"]
+        try:
+            mongo_dedup_checked = check_duplicate_detection(rng, args.dedup_trials, database["resumes"])
+        finally:
+            client.drop_database(database.name)
+    scan_lookup_seconds, indexed_lookup_seconds = time_duplicate_lookups(args.count)
+
+    rewrite_count = check_rewrite_parity(rng, args.fuzz_samples)
+    hostile_sizes = [int(size) for size in args.hostile_sizes.split(",")]
+    hostile_texts = {size: [hostile_resume(rng, size) for _ in range(args.hostile_count)] for size in hostile_sizes}
+    worst_seconds = {size: time_worst_case(texts) for size, texts in hostile_texts.items()}
+    try:
+        for original, rewrite in rewritten_patterns():
+            rewrite.regex = original
+        original_worst_seconds = time_worst_case(hostile_texts[hostile_sizes[0]])
+    finally:
+        for original, rewrite in rewritten_patterns():
+            rewrite.regex = re.compile(rewrite.pattern, rewrite.flags)
+
+    print(f"Resumes parsed:       {args.count}")
+    print(f"Uncompiled patterns:  {uncompiled_seconds * 1000 / args.count:.3f} ms/resume")
+    print(f"Pattern registry:     {compiled_seconds * 1000 / args.count:.3f} ms/resume")
+    print(f"Speedup:              {uncompiled_seconds / compiled_seconds:.2f}x")
+    print(f"Without the guard:    {unguarded_seconds * 1000 / args.count:.3f} ms/resume")
+    print()
+    print(f"Section lines checked: {checked_lines}")
+    print(f"Per-pattern sections: {reference_seconds * 1000 / args.count:.3f} ms/resume")
+    print(f"Combined sections:    {combined_seconds * 1000 / args.count:.3f} ms/resume")
+    print(f"Speedup:              {reference_seconds / combined_seconds:.2f}x")
+    print()
+    print(f"Per-skill regexes:    {regex_skill_seconds * 1000 / args.count:.3f} ms/resume")
+    print(f"Taxonomy automaton:   {matcher_skill_seconds * 1000 / args.count:.3f} ms/resume (with aliases)")
+    print(f"Speedup:              {regex_skill_seconds / matcher_skill_seconds:.2f}x")
+    print(f"Automaton, {len(skill_names) + len(padding)} skills: "
+          f"{large_matcher_skill_seconds * 1000 / args.count:.3f} ms/resume")
+    print()
+    print(f"Per-item parse_resume: {per_item_seconds * 1000 / args.count:.3f} ms/resume")
+    for worker_count, seconds in batch_seconds.items():
+        print(f"parse_resumes, {worker_count} worker(s): {seconds * 1000 / args.count:.3f} ms/resume")
+    print()
+    print(f"Breaker scenarios:    {breaker_scenarios} checked")
+    print()
+    print(f"Dedup uploads checked: {dedup_checked}")
+    if args.mongo_uri:
+        print(f"Against MongoDB:      {mongo_dedup_checked}")
+    print(f"Superseded uploads:   {superseded_uploads}, no CV file left behind")
+    print(f"Full-scan lookup:     {scan_lookup_seconds * 1000:.3f} ms over {args.count} resumes")
+    print(f"Indexed lookup:       {indexed_lookup_seconds * 1000:.3f} ms over {args.count} resumes")
+    print()
+    print(f"Rewrites fuzzed:      {rewrite_count} patterns x {args.fuzz_samples} strings")
+    print(f"Original patterns, {hostile_sizes[0]} chars: {original_worst_seconds * 1000:.1f} ms worst resume")
+    for size in hostile_sizes:
+        print(f"Linear rewrites, {size} chars: {worst_seconds[size] * 1000:.1f} ms worst resume "
+              f"({worst_seconds[size] * 1e6 / size:.2f} us/char)")
+
+if __name__ == "__main__":
+    main()